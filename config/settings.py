@@ -13,7 +13,9 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from urllib.parse import urlparse, parse_qsl
+from django.core.exceptions import ImproperlyConfigured
+
+from config.database import parse_database_url
 
 load_dotenv()
 
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,7 +65,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to core.timing
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,26 +85,20 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-# Try to connect to PostgreSQL, fallback to SQLite if connection fails
+# Try to connect to PostgreSQL, fallback to SQLite if connection fails.
+# Connection lifetime, health checks, pooling and statement timeout are set from
+# DATABASE_URL query parameters; see config/database.py. Only a URL for another
+# database falls back to SQLite; a malformed PostgreSQL URL (port, name or a
+# parameter) stops startup with ImproperlyConfigured.
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if DATABASE_URL:
     try:
-        # Test PostgreSQL connection
-        tmpPostgres = urlparse(DATABASE_URL)
         DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.postgresql',
-                'NAME': tmpPostgres.path.replace('/', ''),
-                'USER': tmpPostgres.username,
-                'PASSWORD': tmpPostgres.password,
-                'HOST': tmpPostgres.hostname,
-                'PORT': 5432,
-                'OPTIONS': dict(parse_qsl(tmpPostgres.query)),
-            }
+            'default': parse_database_url(DATABASE_URL)
         }
         print("Using PostgreSQL database")
-    except Exception as e:
+    except ValueError as e:
         print(f"PostgreSQL connection failed: {e}")
         print("Falling back to SQLite")
         DATABASES = {
@@ -119,6 +117,103 @@ else:
     }
 
 
+# Cache
+# The discount calendar and student index keep version stamps in the default
+# cache, and fragment keys and ETags are built from per-model generation stamps
+# kept there too. Every worker process must therefore share the default cache:
+# 'file' (the default) shares it between the processes on one host. 'locmem' is
+# per process and only allowed with DEBUG on, where a single process serves.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+
+if CACHE_BACKEND == 'locmem' and not DEBUG:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND=locmem keeps invalidation stamps per process; use a shared cache when DEBUG is off'
+    )
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv("CACHE_LOCATION", str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Rendered template fragments (students list, analysis tables). Their keys carry
+# per-model generation stamps kept in the default cache, so either backend
+# serves fresh HTML; 'file' lets worker processes share rendered fragments.
+
+FRAGMENT_CACHE_BACKEND = os.getenv("FRAGMENT_CACHE_BACKEND", "locmem")
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv("FRAGMENT_CACHE_TIMEOUT", "3600"))
+
+if FRAGMENT_CACHE_BACKEND == 'file':
+    CACHES['fragments'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("FRAGMENT_CACHE_LOCATION", str(BASE_DIR / '.cache' / 'fragments')),
+    }
+else:
+    CACHES['fragments'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+    }
+
+
+# Student autocomplete: 'memory' answers from a per-process sorted name index,
+# 'database' queries core_student through its Lower('name') index.
+
+STUDENT_AUTOCOMPLETE_BACKEND = os.getenv("STUDENT_AUTOCOMPLETE_BACKEND", "memory")
+
+# Lookup views (autocomplete, student details, monthly fee, student search):
+# 'sync' or 'async'. Use 'async' when serving config.asgi with uvicorn or
+# daphne, so the lookups wait on the database without holding a worker thread.
+
+LOOKUP_VIEWS = os.getenv("LOOKUP_VIEWS", "sync")
+
+
+# Request timing: every response carries a Server-Timing header and logs one
+# line to core.timing. A request over either budget also logs its full SQL with
+# the line in core/ that ran each query. 0 disables a budget. Per-request lines
+# are logged at INFO, so set REQUEST_TIMING_LOG_LEVEL=INFO to see them while DEBUG
+# is on.
+
+SLOW_REQUEST_QUERY_BUDGET = int(os.getenv("SLOW_REQUEST_QUERY_BUDGET", "0")) or None
+SLOW_REQUEST_TIME_BUDGET_MS = int(os.getenv("SLOW_REQUEST_TIME_BUDGET_MS", "0")) or None
+
+# Metrics: 'process' keeps counters per worker process; 'file' also writes them
+# to METRICS_DIR so /metrics/ can sum every worker (point all workers at the
+# same directory and clear it on deploy).
+
+METRICS_MODE = os.getenv("METRICS_MODE", "process")
+METRICS_DIR = os.getenv("METRICS_DIR", str(BASE_DIR / '.metrics'))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+# Scrapers that cannot log in send "Authorization: Bearer <METRICS_TOKEN>";
+# empty means only staff can read /metrics/
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.getenv("REQUEST_TIMING_LOG_LEVEL", "WARNING" if DEBUG else "INFO"),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
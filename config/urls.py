@@ -14,34 +14,48 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from core import views
+from core import async_views, views
+
+# The debounced HTMX lookups; LOOKUP_VIEWS=async serves them from core.async_views
+lookups = async_views if settings.LOOKUP_VIEWS == 'async' else views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.index, name='index'),
     path('add-payment/', views.add_payment, name='add_payment'),
     path('add-expense/', views.add_expense, name='add_expense'),
+    path('import-payments/', views.import_payments, name='import_payments'),
     path('view-payments/', views.view_payments, name='view_payments'),
     path('view-expenses/', views.view_expenses, name='view_expenses'),
     path('view-confirmed/', views.view_confirmed, name='view_confirmed'),
     path('view-confirmed-payments/', views.view_confirmed_payments, name='view_confirmed_payments'),
     path('view-confirmed-expenses/', views.view_confirmed_expenses, name='view_confirmed_expenses'),
+    path('export-payments/', views.export_payments, name='export_payments'),
+    path('export-expenses/', views.export_expenses, name='export_expenses'),
     path('accept-payment/<int:pk>/', views.accept_payment, name='accept_payment'),
     path('decline-payment/<int:pk>/', views.decline_payment, name='decline_payment'),
     path('approve-expense/<int:pk>/', views.approve_expense, name='approve_expense'),
     path('decline-expense/<int:pk>/', views.decline_expense, name='decline_expense'),
-    path('student-details/', views.get_student_details, name='get_student_details'),
-    path('student-monthly-fee/', views.get_student_monthly_fee, name='get_student_monthly_fee'),
+    path('payments/bulk-accept/', views.bulk_accept_payments, name='bulk_accept_payments'),
+    path('payments/bulk-decline/', views.bulk_decline_payments, name='bulk_decline_payments'),
+    path('expenses/bulk-approve/', views.bulk_approve_expenses, name='bulk_approve_expenses'),
+    path('expenses/bulk-decline/', views.bulk_decline_expenses, name='bulk_decline_expenses'),
+    path('student-details/', lookups.get_student_details, name='get_student_details'),
+    path('student-monthly-fee/', lookups.get_student_monthly_fee, name='get_student_monthly_fee'),
     path('search-students/', views.search_students, name='search_students'),
-    path('search-student-details/', views.search_student_details, name='search_student_details'),
-    path('student-autocomplete/', views.student_autocomplete, name='student_autocomplete'),
+    path('search-student-details/', lookups.search_student_details, name='search_student_details'),
+    path('student-picker/', views.student_picker, name='student_picker'),
+    path('student-autocomplete/', lookups.student_autocomplete, name='student_autocomplete'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('student-annual-report/', views.student_annual_report, name='student_annual_report'),
     path('analyze/', views.analyze_view, name='analyze'),
     path('students/', views.view_students, name='view_students'),
     path('students/add/', views.add_student, name='add_student'),
     path('students/update/<int:pk>/', views.update_student, name='update_student'),
+    path('students/row/<int:pk>/', views.student_row, name='student_row'),
     path('students/delete/<int:pk>/', views.delete_student, name='delete_student'),
     path('signup/', views.signup_view, name='signup'),
     path('login/', views.login_view, name='login'),
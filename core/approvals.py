@@ -0,0 +1,155 @@
+"""
+Batch approval of pending payments and expenses.
+
+Each batch runs in one transaction and writes with bulk_update. Accepting only
+marks the payments; each affected period's standing is then re-derived once
+from its running total, as accepting the payments one by one would, and a
+student's snapshot is written once.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import finance_summary, fragments, metrics
+from .payments import settle_periods
+from .models import DraftExpense, DraftPayment, Student
+
+
+def parse_ids(values):
+    """Turn submitted id strings into a list of unique ints, ignoring junk."""
+    ids = []
+    for value in values:
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            continue
+        if pk not in ids:
+            ids.append(pk)
+    return ids
+
+
+def parse_adjusted_amounts(data, ids):
+    """
+    Read optional per-id adjusted amounts submitted as `amount_<id>`.
+    Raises ValueError for an amount that is not a finite, non-negative decimal.
+    """
+    amounts = {}
+    for pk in ids:
+        value = (data.get(f'amount_{pk}') or '').strip()
+        if not value:
+            continue
+        try:
+            amount = Decimal(value)
+        except InvalidOperation:
+            amount = None
+        if amount is None or not amount.is_finite() or amount < 0:
+            raise ValueError(f'Invalid amount for {pk}: {value}')
+        amounts[pk] = amount
+    return amounts
+
+
+def _bump_on_commit(*model_names):
+    fragments.bump(*model_names)
+    transaction.on_commit(lambda: fragments.bump(*model_names))
+
+
+def accept_payments(ids, username, adjusted_amounts=None):
+    """Accept many payments and update each affected student's snapshot once."""
+    adjusted_amounts = adjusted_amounts or {}
+    changes = finance_summary.SummaryChanges()
+
+    now = timezone.now()
+    with transaction.atomic():
+        payments = list(DraftPayment.objects.select_for_update().filter(pk__in=ids).order_by('id'))
+        periods = set()
+        for payment in payments:
+            before = finance_summary.payment_contribution(payment)
+            if payment.pk in adjusted_amounts:
+                payment.amount = adjusted_amounts[payment.pk]
+            payment.year, payment.month = DraftPayment.normalize_month_year(payment.year, payment.month)
+            payment.status = 'Accepted'
+            payment.oath_user = username
+            payment.updated_at = now
+            changes.payment(before, finance_summary.payment_contribution(payment))
+            if payment.student_id:
+                periods.add((payment.student_id, payment.year, payment.month))
+        DraftPayment.objects.bulk_update(payments, ['amount', 'year', 'month', 'status', 'oath_user', 'updated_at'])
+
+        students = Student.objects.select_for_update().in_bulk({student_id for student_id, _, _ in periods})
+        snapshots = settle_periods(students, periods)
+        for student_id, (year, month, paid_amount, status) in snapshots.items():
+            student = students[student_id]
+            before = finance_summary.student_contribution(student)
+            student.year, student.month = year, month
+            student.paid_amount, student.payment_status = paid_amount, status
+            student.updated_at = now
+            changes.student(before, finance_summary.student_contribution(student))
+        for payment in payments:
+            if payment.student_id:
+                payment.student = students[payment.student_id]
+
+        Student.objects.bulk_update(
+            [students[student_id] for student_id in snapshots],
+            ['year', 'month', 'paid_amount', 'payment_status', 'updated_at'],
+        )
+        changes.apply()
+        metrics.inc_on_commit('payments_accepted_total', len(payments))
+        # bulk_update sends no signals
+        _bump_on_commit('Student', 'DraftPayment')
+    return payments
+
+
+def decline_payments(ids, username):
+    changes = finance_summary.SummaryChanges()
+    now = timezone.now()
+    with transaction.atomic():
+        payments = list(DraftPayment.objects.select_for_update().filter(pk__in=ids).order_by('id'))
+        for payment in payments:
+            changes.payment(finance_summary.payment_contribution(payment), None)
+            payment.status = 'Declined'
+            payment.oath_user = username
+            payment.updated_at = now
+        DraftPayment.objects.bulk_update(payments, ['status', 'oath_user', 'updated_at'])
+        changes.apply()
+        metrics.inc_on_commit('payments_declined_total', len(payments))
+        _bump_on_commit('DraftPayment')
+    return payments
+
+
+def approve_expenses(ids, username, adjusted_amounts=None):
+    adjusted_amounts = adjusted_amounts or {}
+    changes = finance_summary.SummaryChanges()
+    now = timezone.now()
+    with transaction.atomic():
+        expenses = list(DraftExpense.objects.select_for_update().filter(pk__in=ids).order_by('id'))
+        for expense in expenses:
+            before = finance_summary.expense_contribution(expense)
+            if expense.pk in adjusted_amounts:
+                expense.amount = adjusted_amounts[expense.pk]
+            expense.status = 'Accepted'
+            expense.oath_user = username
+            expense.updated_at = now
+            changes.expense(before, finance_summary.expense_contribution(expense))
+        DraftExpense.objects.bulk_update(expenses, ['amount', 'status', 'oath_user', 'updated_at'])
+        changes.apply()
+        metrics.inc_on_commit('expenses_approved_total', len(expenses))
+        _bump_on_commit('DraftExpense')
+    return expenses
+
+
+def decline_expenses(ids, username):
+    changes = finance_summary.SummaryChanges()
+    now = timezone.now()
+    with transaction.atomic():
+        expenses = list(DraftExpense.objects.select_for_update().filter(pk__in=ids).order_by('id'))
+        for expense in expenses:
+            changes.expense(finance_summary.expense_contribution(expense), None)
+            expense.status = 'Declined'
+            expense.oath_user = username
+            expense.updated_at = now
+        DraftExpense.objects.bulk_update(expenses, ['status', 'oath_user', 'updated_at'])
+        changes.apply()
+        metrics.inc_on_commit('expenses_declined_total', len(expenses))
+        _bump_on_commit('DraftExpense')
+    return expenses
@@ -0,0 +1,130 @@
+"""
+Async versions of the debounced HTMX lookups, served when LOOKUP_VIEWS=async.
+
+Under ASGI these wait on the database without holding a worker thread, so a
+burst of keystrokes does not queue behind the thread pool. They return exactly
+what the sync views in core.views return. Student lookups use the async ORM and
+fees come from the preloaded discount calendar; the month search, which
+paginates, still runs the sync code in a worker thread.
+"""
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+
+from . import student_index
+from .conditional import conditional_on
+from .discount_calendar import aget_calendar
+from .fees import acalculate_required_fees
+from .models import DraftPayment, Student
+from .views import _render_month_search, get_next_payment_month_year
+
+
+async def acalculate_required_fee(student, year, month):
+    year, month = int(year), int(month)
+    fees = await acalculate_required_fees([student], (year, month), (year, month))
+    return fees[(student.pk, year, month)]
+
+
+@login_required(login_url='login')
+@conditional_on('Student', 'StudentMonthlyStatus', 'DraftPayment', 'HolidayMonth', 'StudentDiscount')
+async def get_student_details(request):
+    search_type = request.GET.get('search_type', 'student')
+    search_query = (
+        request.GET.get('search_input', '')
+        or request.GET.get('student_name', '')
+    ).strip()
+
+    if search_type == 'month':
+        return await sync_to_async(_render_month_search)(request, search_query)
+
+    try:
+        student = await Student.objects.aget(name__iexact=search_query)
+    except (Student.DoesNotExist, ValueError):
+        return render(request, 'partials/student_details.html', {'student': None})
+
+    next_month, next_year, remaining_fee = get_next_payment_month_year(student, calendar=await aget_calendar())
+    return render(request, 'partials/student_details.html', {
+        'student': student,
+        'next_month': next_month,
+        'next_year': next_year,
+        'remaining_fee': remaining_fee
+    })
+
+
+@login_required(login_url='login')
+@conditional_on('Student', 'HolidayMonth', 'StudentDiscount')
+async def get_student_monthly_fee(request):
+    student_id = request.GET.get('student_id', '')
+    month = request.GET.get('month', '')
+    year = request.GET.get('year', '')
+
+    try:
+        student = await Student.objects.aget(pk=student_id)
+        if month and year:
+            required_fee = await acalculate_required_fee(student, int(year), int(month))
+        else:
+            today = datetime.now()
+            required_fee = await acalculate_required_fee(student, today.year, today.month)
+        return HttpResponse(str(required_fee))
+    except (Student.DoesNotExist, ValueError):
+        return HttpResponse('0')
+
+
+@login_required(login_url='login')
+async def search_student_details(request):
+    search_type = request.GET.get('search_type', 'student').strip() or 'student'
+    search_query = (
+        request.GET.get('search_input', '')
+        or request.GET.get('search_name', '')
+    ).strip()
+
+    if search_type == 'month':
+        return await sync_to_async(_render_month_search)(request, search_query)
+
+    student = None
+    last_paid_month = None
+    current_month_status = None
+    today = datetime.now()
+
+    if search_query:
+        try:
+            student = await Student.objects.aget(name__iexact=search_query)
+        except Student.DoesNotExist:
+            pass
+
+    if student:
+        last_paid_month = DraftPayment.get_last_paid_month(student)
+        if student.year == today.year and student.month == today.month:
+            current_month_status = {
+                'status': student.payment_status,
+                'amount': student.paid_amount,
+            }
+
+    return render(request, 'partials/search_student_results.html', {
+        'student': student,
+        'search_query': search_query,
+        'last_paid_month': last_paid_month,
+        'current_month_status': current_month_status,
+        'selected_year': today.year,
+    })
+
+
+@login_required(login_url='login')
+async def student_autocomplete(request):
+    """Return student names that start with the given query"""
+    query = request.GET.get('q', '').strip()
+
+    if not query:
+        return JsonResponse({'suggestions': []})
+
+    if settings.STUDENT_AUTOCOMPLETE_BACKEND == 'database':
+        names = await student_index.adatabase_prefix(query, limit=10)
+    else:
+        index = await student_index.aget_index()
+        names = index.prefix(query, limit=10)
+
+    return JsonResponse({'suggestions': [{'name': name} for name in names]})
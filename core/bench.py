@@ -0,0 +1,562 @@
+"""
+Synthetic-load benchmark of every URL.
+
+seed() fills the current database with a deterministic dataset: students,
+years of payments and expenses, a pending queue, holidays and discounts.
+run() then sends each URL's scenario through the test client and measures
+latency, query count and peak Python memory. Each request runs in a
+transaction that is rolled back, so writing endpoints see the same data on
+every iteration. The bench command runs this against a throwaway test database.
+
+connection_throughput() measures concurrent requests/sec under each database
+connection setting (per-request, persistent, pooled); see bench_connections.
+wsgi_concurrency() and asgi_concurrency() put many concurrent users on the
+lookup endpoints, sync views on a worker pool versus async views on one event
+loop; see bench_lookups. payment_contention() has concurrent cashiers take
+part-payments for the same students and checks that none were lost; see
+stress_payments.
+"""
+import asyncio
+import importlib
+import random
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, clear_url_caches, get_resolver, reverse
+
+from . import discount_calendar, finance_summary, ledger, student_index
+from .models import DraftExpense, DraftPayment, HolidayMonth, Student, StudentDiscount
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+END_YEAR = 2025
+
+BATCH_SIZE = 5000
+
+FEES = [Decimal('1500'), Decimal('2000'), Decimal('2500'), Decimal('3000')]
+
+EXPENSE_NAMES = ['Electricity', 'Water', 'Rent', 'Stationery', 'Cleaning', 'Internet', 'Repairs']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Dataset:
+    """What seed() created, plus the rows the scenarios point at."""
+
+    def __init__(self, **counts):
+        self.counts = counts
+        self.user = None
+        self.student = None
+        self.draft_payment_ids = []
+        self.draft_expense_ids = []
+        self.holiday_id = None
+        self.discount_id = None
+
+
+def seed(students=1000, years=1, seed=1):
+    """Create a deterministic dataset in the current database and return a Dataset."""
+    rng = random.Random(seed)
+    periods = [(year, month) for year in range(END_YEAR - years + 1, END_YEAR + 1) for month in range(1, 13)]
+
+    user = User.objects.create_user(username='bench', password='bench', is_staff=True)
+    Student.objects.bulk_create(
+        [Student(name=f'Student {number:06d}', monthly_fee=rng.choice(FEES)) for number in range(students)],
+        batch_size=BATCH_SIZE,
+    )
+    roster = list(Student.objects.order_by('id'))
+
+    holidays = HolidayMonth.objects.bulk_create([
+        HolidayMonth(year=year, month=12, discount_type='Full', reason='Year-end holiday')
+        for year in range(END_YEAR - years + 1, END_YEAR + 1)
+    ] + [HolidayMonth(year=END_YEAR, month=8, discount_type='Percentage', discount_value=Decimal('50'))])
+    discounted = rng.sample(roster, max(1, students // 50))
+    StudentDiscount.objects.bulk_create([
+        StudentDiscount(
+            student=student, year=END_YEAR, month=rng.randint(1, 11),
+            discount_type=rng.choice(['Full', 'Percentage', 'Amount']), discount_value=Decimal('20'),
+        )
+        for student in discounted
+    ])
+    discount_calendar.invalidate()
+
+    payments = []
+    for student in roster:
+        for year, month in periods:
+            if month == 12 or rng.random() < 0.15:
+                continue
+            amount = student.monthly_fee if rng.random() < 0.9 else student.monthly_fee / 2
+            payments.append(DraftPayment(
+                student=student, user=user, amount=amount, monthly_fee=student.monthly_fee,
+                year=year, month=month, status='Paid' if amount == student.monthly_fee else 'Half Paid',
+                created_date=datetime(year, month, rng.randint(1, 28), tzinfo=dt_timezone.utc),
+            ))
+            student.year, student.month = year, month
+            student.paid_amount, student.payment_status = amount, payments[-1].status
+        if len(payments) >= BATCH_SIZE:
+            DraftPayment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+            payments = []
+    DraftPayment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+    Student.objects.bulk_update(roster, ['year', 'month', 'paid_amount', 'payment_status'], batch_size=BATCH_SIZE)
+
+    pending = DraftPayment.objects.bulk_create([
+        DraftPayment(student=student, user=user, amount=student.monthly_fee, monthly_fee=student.monthly_fee,
+                     year=END_YEAR + 1, month=1, status='Draft')
+        for student in rng.sample(roster, max(1, students // 100))
+    ])
+
+    expenses = [
+        DraftExpense(
+            name=rng.choice(EXPENSE_NAMES), amount=Decimal(rng.randint(500, 50000)), user=user,
+            status='Accepted', created_time=datetime(year, month, rng.randint(1, 28), tzinfo=dt_timezone.utc),
+            year=year, month=month,
+        )
+        for year, month in periods for _ in range(max(5, students // 200))
+    ]
+    drafts = [DraftExpense(name=rng.choice(EXPENSE_NAMES), amount=Decimal('1000'), user=user) for _ in range(20)]
+    for expense in drafts:
+        # bulk_create skips save(), which books an expense to its entry month
+        expense.year, expense.month = expense.entry_period()
+    expenses += drafts
+    DraftExpense.objects.bulk_create(expenses, batch_size=BATCH_SIZE)
+
+    finance_summary.rebuild()
+    ledger.backfill()
+    student_index.invalidate()
+
+    dataset = Dataset(
+        students=students,
+        payments=DraftPayment.objects.count(),
+        expenses=len(expenses),
+        holidays=len(holidays),
+        discounts=len(discounted),
+    )
+    dataset.user = user
+    dataset.student = roster[len(roster) // 2]
+    dataset.draft_payment_ids = [payment.pk for payment in pending]
+    dataset.draft_expense_ids = list(DraftExpense.objects.filter(status='Draft').values_list('id', flat=True))
+    dataset.holiday_id = holidays[0].pk
+    dataset.discount_id = StudentDiscount.objects.values_list('id', flat=True).first()
+    return dataset
+
+
+def scenarios(dataset):
+    """
+    url name -> (method, kwargs, data, options). Writing endpoints get the
+    request a user would actually send; the transaction is rolled back after.
+    """
+    student = dataset.student
+    payment_id = dataset.draft_payment_ids[0]
+    expense_id = dataset.draft_expense_ids[0]
+    return {
+        'index': ('get', {}, {}, {}),
+        'add_payment': ('post', {}, {
+            'student_id': student.pk, 'amount': student.monthly_fee, 'monthly_fee': student.monthly_fee,
+            'month': 1, 'year': END_YEAR + 1,
+        }, {}),
+        'add_expense': ('post', {}, {'name': 'Bench expense', 'amount': '1000', 'description': 'bench'}, {}),
+        'import_payments': ('get', {}, {}, {}),
+        'view_payments': ('get', {}, {}, {}),
+        'view_expenses': ('get', {}, {}, {}),
+        'view_confirmed': ('get', {}, {}, {}),
+        'view_confirmed_payments': ('get', {}, {}, {}),
+        'view_confirmed_expenses': ('get', {}, {}, {}),
+        'export_payments': ('get', {}, {'year': END_YEAR}, {}),
+        'export_expenses': ('get', {}, {'year': END_YEAR}, {}),
+        'accept_payment': ('post', {'pk': payment_id}, {}, {}),
+        'decline_payment': ('post', {'pk': payment_id}, {}, {}),
+        'approve_expense': ('post', {'pk': expense_id}, {}, {}),
+        'decline_expense': ('post', {'pk': expense_id}, {}, {}),
+        'bulk_accept_payments': ('post', {}, {'ids': dataset.draft_payment_ids}, {}),
+        'bulk_decline_payments': ('post', {}, {'ids': dataset.draft_payment_ids}, {}),
+        'bulk_approve_expenses': ('post', {}, {'ids': dataset.draft_expense_ids}, {}),
+        'bulk_decline_expenses': ('post', {}, {'ids': dataset.draft_expense_ids}, {}),
+        'get_student_details': ('get', {}, {'search_input': student.name}, {}),
+        'get_student_monthly_fee': ('get', {}, {'student_id': student.pk, 'month': 8, 'year': END_YEAR}, {}),
+        'search_students': ('get', {}, {}, {}),
+        'search_student_details': ('get', {}, {'search_type': 'month', 'search_input': f'March {END_YEAR}'}, {}),
+        'student_picker': ('get', {}, {'q': student.name[:9]}, {}),
+        'student_autocomplete': ('get', {}, {'q': student.name[:10]}, {}),
+        'metrics': ('get', {}, {}, {}),
+        'student_annual_report': ('get', {}, {'student_id': student.pk, 'year': END_YEAR}, {}),
+        'analyze': ('get', {}, {}, {}),
+        'view_students': ('get', {}, {}, {}),
+        'add_student': ('post', {}, {'name': 'Bench Student', 'monthly_fee': '2000'}, {}),
+        'update_student': ('post', {'pk': student.pk}, {'name': student.name, 'monthly_fee': '2100'}, {}),
+        'student_row': ('get', {'pk': student.pk}, {}, {}),
+        'delete_student': ('post', {'pk': student.pk}, {}, {}),
+        'signup': ('get', {}, {}, {'anonymous': True}),
+        'login': ('get', {}, {}, {'anonymous': True}),
+        'logout': ('get', {}, {}, {'fresh_login': True}),
+        'manage_holidays': ('get', {}, {}, {}),
+        'delete_holiday': ('post', {'holiday_id': dataset.holiday_id}, {}, {}),
+        'delete_student_discount': ('post', {'discount_id': dataset.discount_id}, {}, {}),
+    }
+
+
+def url_names(patterns=None, namespace=None):
+    """Yield (name, namespace) for every named URL in the root URLconf."""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns, pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name, namespace
+
+
+def _send(client, method, path, data):
+    with transaction.atomic():
+        response = getattr(client, method)(path, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(client, user, method, path, data, options, requests):
+    if options.get('anonymous') or options.get('fresh_login'):
+        client = Client()
+
+    def request():
+        # Logging out ends the session, so log this client back in every time
+        if options.get('fresh_login'):
+            client.force_login(user)
+        return _send(client, method, path, data)
+
+    response = request()
+    timings = []
+    queries = []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'method': method.upper(),
+        'path': path,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'queries': percentile(queries, 0.50),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(dataset, requests=20, only=None):
+    """Benchmark every URL and return {'endpoints': ..., 'skipped': ...}."""
+    client = Client()
+    client.force_login(dataset.user)
+    table = scenarios(dataset)
+    endpoints = {}
+    skipped = {}
+    for name, namespace in url_names():
+        if namespace:
+            skipped[f'{namespace}:*'] = 'third-party URLs'
+            continue
+        if only and name not in only:
+            continue
+        if name not in table:
+            skipped[name] = 'no scenario defined'
+            continue
+        method, kwargs, data, options = table[name]
+        endpoints[name] = measure(client, dataset.user, method, reverse(name, kwargs=kwargs), data, options, requests)
+    return {'endpoints': endpoints, 'skipped': skipped}
+
+
+# Connection settings compared by connection_throughput(); 'pool' needs PostgreSQL with psycopg 3
+CONNECTION_MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+}
+
+
+def pooling_supported():
+    from config.database import pooling_available
+    return connection.vendor == 'postgresql' and pooling_available()
+
+
+def connection_throughput(dataset, mode, threads=8, requests=200, url='get_student_monthly_fee'):
+    """
+    Send `requests` GETs from each of `threads` concurrent clients with the given
+    CONNECTION_MODES entry applied, and return requests/sec and latency. Unlike
+    run(), requests are not wrapped in a transaction, so every one goes through
+    the real connection lifecycle: opened per request, kept, or borrowed from a pool.
+    """
+    settings_dict = connection.settings_dict
+    saved = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    saved_options = settings_dict['OPTIONS']
+
+    connections.close_all()
+    settings_dict.update(CONNECTION_MODES[mode])
+    # Every connection is built from this same dict, including those of new threads
+    settings_dict['OPTIONS'] = {key: value for key, value in saved_options.items() if key != 'pool'}
+    if mode == 'pool':
+        settings_dict['OPTIONS']['pool'] = {'min_size': threads, 'max_size': threads}
+
+    path = reverse(url)
+    data = {'student_id': dataset.student.pk}
+    clients = []
+    for _ in range(threads):
+        client = Client()
+        client.force_login(dataset.user)
+        clients.append(client)
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(client):
+        samples = []
+        failures = 0
+        try:
+            start.wait()
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(path, data)
+                samples.append((time.perf_counter() - started) * 1000)
+                failures += response.status_code != 200
+        finally:
+            connections.close_all()
+            with lock:
+                latencies.extend(samples)
+                errors.append(failures)
+
+    workers = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    try:
+        for thread in workers:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if mode == 'pool':
+            connection.close_pool()
+        connections.close_all()
+        settings_dict.update(saved)
+        settings_dict['OPTIONS'] = saved_options
+
+    return {
+        'threads': threads,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+    }
+
+
+@contextmanager
+def lookup_views(mode):
+    """Serve the lookup URLs from the 'sync' or 'async' views while inside the block."""
+    import config.urls
+
+    try:
+        with override_settings(LOOKUP_VIEWS=mode):
+            importlib.reload(config.urls)
+            clear_url_caches()
+            yield
+    finally:
+        # Rebuilt outside override_settings, so with the configured LOOKUP_VIEWS again
+        importlib.reload(config.urls)
+        clear_url_caches()
+
+
+def lookup_targets(dataset):
+    """(path, query) pairs that cycle through the four debounced lookups."""
+    name = dataset.student.name
+    return [
+        (reverse('student_autocomplete'), {'q': name[:9]}),
+        (reverse('get_student_details'), {'search_input': name}),
+        (reverse('get_student_monthly_fee'), {'student_id': dataset.student.pk, 'year': END_YEAR, 'month': 6}),
+        (reverse('search_student_details'), {'search_input': name}),
+    ]
+
+
+def _logged_in_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def _summary(elapsed, latencies, errors, **extra):
+    return {
+        **extra,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+    }
+
+
+def wsgi_concurrency(dataset, clients=200, requests=20, threads=16):
+    """
+    `clients` concurrent users sending `requests` lookups each to the sync views,
+    served by a WSGI-style pool of `threads` worker threads. Latency includes the
+    time a request waits for a free worker.
+    """
+    session = _logged_in_cookie(dataset.user)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    workers = threading.BoundedSemaphore(threads)
+    start = threading.Barrier(clients + 1)
+
+    def user_loop(number):
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session
+        targets = lookup_targets(dataset)
+        samples = []
+        failures = 0
+        try:
+            start.wait()
+            for sent in range(requests):
+                path, data = targets[(number + sent) % len(targets)]
+                started = time.perf_counter()
+                with workers:
+                    response = client.get(path, data)
+                samples.append((time.perf_counter() - started) * 1000)
+                failures += response.status_code != 200
+        finally:
+            connections.close_all()
+            with lock:
+                latencies.extend(samples)
+                errors.append(failures)
+
+    with lookup_views('sync'):
+        users = [threading.Thread(target=user_loop, args=(number,)) for number in range(clients)]
+        for thread in users:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in users:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    return _summary(elapsed, latencies, sum(errors), clients=clients, threads=threads)
+
+
+def asgi_concurrency(dataset, clients=200, requests=20):
+    """The same load against the async views, as one ASGI event loop serves it."""
+    session = _logged_in_cookie(dataset.user)
+    latencies = []
+    errors = []
+
+    async def user_loop(number):
+        client = AsyncClient()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session
+        targets = lookup_targets(dataset)
+        for sent in range(requests):
+            path, data = targets[(number + sent) % len(targets)]
+            started = time.perf_counter()
+            response = await client.get(path, data)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors.append(response.status_code != 200)
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(user_loop(number) for number in range(clients)))
+        return time.perf_counter() - started
+
+    with lookup_views('async'):
+        elapsed = asyncio.run(main())
+    connections.close_all()
+    return _summary(elapsed, latencies, sum(errors), clients=clients)
+
+
+def payment_contention(writers=16, payments=50, students=1, retries=50):
+    """
+    `writers` threads each take `payments` part-payments of Rs.1 through
+    payments.apply_payment, spread over `students` students and one period,
+    all at once. Afterwards every student's paid_amount must equal the sum of
+    their successful payments; any shortfall is a lost update.
+    """
+    from .payments import apply_payment
+
+    user, _ = User.objects.get_or_create(username='bench-cashier')
+    roster = Student.objects.bulk_create([
+        # A fee no test run can reach, so every payment stays a part-payment of the same month
+        Student(name=f'Contention {number:03d}', monthly_fee=Decimal('99999999')) for number in range(students)
+    ])
+    year, month = END_YEAR, 6
+    amount = Decimal('1.00')
+
+    applied = defaultdict(Decimal)
+    counts = {'retries': 0, 'failed': 0}
+    latencies = []
+    lock = threading.Lock()
+    start = threading.Barrier(writers + 1)
+
+    def writer(number):
+        try:
+            start.wait()
+            for sent in range(payments):
+                student = roster[(number + sent) % len(roster)]
+                for attempt in range(retries + 1):
+                    started = time.perf_counter()
+                    try:
+                        apply_payment(student.pk, amount, month, year, user=user)
+                    except OperationalError:
+                        # SQLite reports a locked database instead of waiting on the row
+                        with lock:
+                            counts['retries'] += 1
+                        time.sleep(random.uniform(0.001, 0.01))
+                        continue
+                    with lock:
+                        applied[student.pk] += amount
+                        latencies.append((time.perf_counter() - started) * 1000)
+                    break
+                else:
+                    with lock:
+                        counts['failed'] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    lost = {}
+    for student in Student.objects.filter(pk__in=[student.pk for student in roster]):
+        recorded = DraftPayment.objects.filter(student=student).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        if student.paid_amount != applied[student.pk] or recorded != applied[student.pk]:
+            lost[student.name] = {
+                'applied': str(applied[student.pk]),
+                'paid_amount': str(student.paid_amount),
+                'recorded': str(recorded),
+            }
+
+    return _summary(
+        elapsed, latencies, counts['failed'],
+        writers=writers, students=students, retries=counts['retries'], lost_updates=lost,
+    )
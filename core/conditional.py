@@ -0,0 +1,108 @@
+"""
+Conditional GET for read-only views.
+
+A view decorated with @conditional_on('Student', ...) gets an ETag built from
+the generation stamps of the models it reads (see core.fragments) and a
+Last-Modified from the newest updated_at among them. A client that already
+holds the current version gets a 304 before the view body runs. The stamps
+also change on deletes and bulk writes, which updated_at cannot see, so
+clients that send If-None-Match (all browsers do) never get a stale 304.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import fragments
+
+# Column used as the Last-Modified watermark, per model
+WATERMARK_FIELDS = {
+    'Student': 'updated_at',
+    'DraftPayment': 'updated_at',
+    'DraftExpense': 'updated_at',
+    'HolidayMonth': 'updated_at',
+    'StudentDiscount': 'updated_at',
+    'StudentMonthlyStatus': 'updated_date',
+}
+
+MISSING = object()
+
+
+def data_etag(request, model_names):
+    """Hash of the models' stamps and everything else the response varies on."""
+    parts = fragments.generations(model_names) + [
+        request.get_full_path(),
+        str(request.user.pk),
+        request.headers.get('HX-Request', ''),
+        # Views without a year/month default to the current one
+        timezone.localdate().isoformat(),
+        # A rotated CSRF secret must not be answered with a page holding old tokens
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+
+def data_last_modified(model_names):
+    """
+    The newest updated_at among the models' rows, or None if they are empty.
+    Cached under the models' stamps, so it costs no queries until one changes.
+    """
+    stamps = fragments.generations(model_names)
+    key = 'core:last-modified:' + hashlib.md5(':'.join(stamps).encode()).hexdigest()
+    found = cache.get(key, MISSING)
+    if found is not MISSING:
+        return found
+    watermarks = []
+    for name in model_names:
+        field = WATERMARK_FIELDS.get(name)
+        if field:
+            model = apps.get_model('core', name)
+            watermarks.append(model.objects.aggregate(latest=Max(field))['latest'])
+    watermarks = [watermark for watermark in watermarks if watermark is not None]
+    latest = max(watermarks) if watermarks else None
+    cache.set(key, latest, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+    return latest
+
+
+def _finish(response):
+    # Let the browser keep the response but revalidate it every time
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['HX-Request'])
+    return response
+
+
+def conditional_on(*model_names):
+    """Answer GET/HEAD with 304 Not Modified while the named models are unchanged."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            def validators(request):
+                return data_etag(request, model_names), data_last_modified(model_names)
+
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                # condition() calls its functions on the event loop, so look them up first
+                etag, last_modified = await sync_to_async(validators)(request)
+                conditioned = condition(
+                    etag_func=lambda *args, **kwargs: etag,
+                    last_modified_func=lambda *args, **kwargs: last_modified,
+                )(view)
+                return _finish(await conditioned(request, *args, **kwargs))
+            return async_wrapped
+
+        conditioned = condition(
+            etag_func=lambda request, *args, **kwargs: data_etag(request, model_names),
+            last_modified_func=lambda request, *args, **kwargs: data_last_modified(model_names),
+        )(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return _finish(conditioned(request, *args, **kwargs))
+        return wrapped
+    return decorator
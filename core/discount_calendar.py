@@ -0,0 +1,74 @@
+"""
+Process-local calendar of global holidays and student-specific discounts.
+
+Holidays and discounts change a few times a year but are read on every fee
+lookup, so the whole calendar is loaded once and kept in memory. A version
+stamp stored in the shared Django cache tells every worker process when its
+copy is stale; saving or deleting a HolidayMonth or StudentDiscount bumps it.
+"""
+from .models import HolidayMonth, StudentDiscount
+from .versioned import VersionedSnapshot
+
+VERSION_CACHE_KEY = 'core:discount_calendar:version'
+
+
+class DiscountCalendar:
+    """In-memory snapshot of HolidayMonth and StudentDiscount rows."""
+
+    def __init__(self, version, holidays, student_discounts):
+        self.version = version
+        # (year, month) -> HolidayMonth
+        self.holidays = holidays
+        # (student_id, year, month) -> StudentDiscount
+        self.student_discounts = student_discounts
+
+    @classmethod
+    def load(cls, version):
+        holidays = {
+            (holiday.year, holiday.month): holiday
+            for holiday in HolidayMonth.objects.all()
+        }
+        student_discounts = {
+            (discount.student_id, discount.year, discount.month): discount
+            for discount in StudentDiscount.objects.all()
+        }
+        return cls(version, holidays, student_discounts)
+
+    def holiday(self, year, month):
+        return self.holidays.get((year, month))
+
+    def student_discount(self, student_id, year, month):
+        return self.student_discounts.get((student_id, year, month))
+
+    def is_full_discount(self, student_id, year, month):
+        """True when the student owes nothing for the month because of a Full rule."""
+        student_discount = self.student_discount(student_id, year, month)
+        if student_discount is not None:
+            return student_discount.discount_type == 'Full'
+        holiday = self.holiday(year, month)
+        return holiday is not None and holiday.discount_type == 'Full'
+
+    def full_discount_periods(self, student_id, periods):
+        """Return the subset of (year, month) periods the student does not pay for."""
+        return {
+            (year, month) for year, month in periods
+            if self.is_full_discount(student_id, year, month)
+        }
+
+
+_snapshot = VersionedSnapshot(VERSION_CACHE_KEY, DiscountCalendar.load)
+
+
+def get_calendar():
+    """Return the current calendar, rebuilding it if another process invalidated it."""
+    return _snapshot.get()
+
+
+async def aget_calendar():
+    """get_calendar() for async views."""
+    return await _snapshot.aget()
+
+
+def invalidate():
+    """Drop this process's calendar and bump the shared version stamp."""
+    _snapshot.invalidate()
@@ -0,0 +1,123 @@
+"""
+CSV export of confirmed payments and expenses.
+
+Rows are read with values_list() over .iterator(), and the CSV is produced
+one line at a time. An export of any size runs in constant memory and can
+start sending bytes before the query has finished.
+"""
+import csv
+
+from .finance_summary import CONFIRMED_PAYMENT_STATUSES
+from .models import DraftExpense, DraftPayment
+
+CHUNK_SIZE = 2000
+
+PAYMENT_COLUMNS = [
+    ('id', 'Payment ID'),
+    ('student_id', 'Student ID'),
+    ('student__name', 'Student Name'),
+    ('year', 'Year'),
+    ('month', 'Month'),
+    ('amount', 'Amount'),
+    ('monthly_fee', 'Monthly Fee'),
+    ('status', 'Status'),
+    ('created_date', 'Created'),
+    ('user__username', 'User'),
+    ('oath_user', 'Approved By'),
+    ('description', 'Description'),
+]
+
+EXPENSE_COLUMNS = [
+    ('id', 'Expense ID'),
+    ('name', 'Expense'),
+    ('amount', 'Amount'),
+    ('status', 'Status'),
+    ('year', 'Year'),
+    ('month', 'Month'),
+    ('created_time', 'Created'),
+    ('user__username', 'User'),
+    ('oath_user', 'Approved By'),
+    ('description', 'Description'),
+]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def confirmed_payments(year=None, month=None, student=None, status=None):
+    """
+    Confirmed payments filtered by period, student (id or name) and status.
+    A status outside the confirmed statuses matches nothing.
+    """
+    payments = DraftPayment.objects.filter(
+        status__in=CONFIRMED_PAYMENT_STATUSES, student__isnull=False
+    )
+    if status:
+        payments = payments.filter(status=status)
+    if _to_int(year) is not None:
+        payments = payments.filter(year=_to_int(year))
+    if _to_int(month) is not None:
+        payments = payments.filter(month=_to_int(month))
+    if student:
+        student_id = _to_int(student)
+        if student_id is not None:
+            payments = payments.filter(student_id=student_id)
+        else:
+            payments = payments.filter(student__name__iexact=student)
+    return payments.order_by('year', 'month', 'id')
+
+
+def confirmed_expenses(year=None, month=None, status=None):
+    """
+    Accepted expenses filtered by the period they are booked to.
+    A status other than Accepted matches nothing.
+    """
+    expenses = DraftExpense.objects.filter(status='Accepted')
+    if status:
+        expenses = expenses.filter(status=status)
+    if _to_int(year) is not None:
+        expenses = expenses.filter(year=_to_int(year))
+    if _to_int(month) is not None:
+        expenses = expenses.filter(month=_to_int(month))
+    return expenses.order_by('year', 'month', 'id')
+
+
+def iter_rows(queryset, columns):
+    """Yield the header row and then one tuple per record, fetched in chunks."""
+    yield [label for _, label in columns]
+    yield from queryset.values_list(*[field for field, _ in columns]).iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Yield each row as an encoded CSV line."""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(rows, file):
+    """Write rows to an open text file and return the number of data rows."""
+    writer = csv.writer(file)
+    count = -1
+    for count, row in enumerate(rows):
+        writer.writerow(row)
+    return max(count, 0)
+
+
+def payment_rows(**filters):
+    return iter_rows(confirmed_payments(**filters), PAYMENT_COLUMNS)
+
+
+def expense_rows(**filters):
+    return iter_rows(confirmed_expenses(**filters), EXPENSE_COLUMNS)
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from .discount_calendar import aget_calendar, get_calendar
+
+
+def period_index(year, month):
+    """Pack a (year, month) pair into a single comparable integer."""
+    return int(year) * 12 + (int(month) - 1)
+
+
+def iter_periods(start, end):
+    """
+    Yield (year, month) tuples from start to end inclusive.
+    Both bounds are (year, month) tuples.
+    """
+    for index in range(period_index(*start), period_index(*end) + 1):
+        yield index // 12, (index % 12) + 1
+
+
+def apply_discount(monthly_fee, discount_type, discount_value):
+    """
+    Apply a Full/Percentage/Amount discount to a monthly fee.
+    Returns None for an unknown discount type so the caller can fall through
+    to the next rule.
+    """
+    if discount_type == 'Full':
+        return Decimal('0')
+    elif discount_type == 'Percentage':
+        discount = (monthly_fee * discount_value) / 100
+        return max(Decimal('0'), monthly_fee - discount)
+    elif discount_type == 'Amount':
+        return max(Decimal('0'), monthly_fee - discount_value)
+    return None
+
+
+def resolve_required_fee(monthly_fee, student_discount=None, holiday=None):
+    """
+    Price one student-month. A student-specific discount beats a global holiday,
+    and with neither the full monthly fee is due.
+    """
+    for rule in (student_discount, holiday):
+        if rule is None:
+            continue
+        fee = apply_discount(monthly_fee, rule.discount_type, rule.discount_value)
+        if fee is not None:
+            return fee
+    return monthly_fee
+
+
+def payment_status_for(total_paid, required_fee):
+    """Status of a month given everything paid towards it, as add_payment decides it."""
+    if total_paid >= required_fee:
+        return 'Paid'
+    elif total_paid > 0:
+        return 'Half Paid'
+    return 'Unpaid'
+
+
+def calculate_required_fees(students, start, end, calendar=None):
+    """
+    Calculate the required fee for many students over a range of periods.
+
+    `students` may be a Student queryset or an iterable of Student instances;
+    `start` and `end` are inclusive (year, month) tuples. Returns a dict keyed by
+    (student_id, year, month). Holidays and discounts come from the in-memory
+    discount calendar, so once it is warm the only query is for the students.
+    Given an already loaded `calendar` and Student instances, it runs no queries.
+    """
+    periods = list(iter_periods(start, end))
+    calendar = calendar or get_calendar()
+
+    fees = {}
+    for student in students:
+        for year, month in periods:
+            fees[(student.pk, year, month)] = resolve_required_fee(
+                student.monthly_fee,
+                student_discount=calendar.student_discount(student.pk, year, month),
+                holiday=calendar.holiday(year, month),
+            )
+    return fees
+
+
+async def acalculate_required_fees(students, start, end):
+    """
+    calculate_required_fees() for async views. `students` must be Student
+    instances, not a queryset; the calendar is loaded off the event loop.
+    """
+    return calculate_required_fees(students, start, end, calendar=await aget_calendar())
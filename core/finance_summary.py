@@ -0,0 +1,170 @@
+"""
+Incremental maintenance of MonthlyFinanceSummary.
+
+Each tracked row (payment, expense, student snapshot) "contributes" to at most
+one summary month. Flows capture a row's contribution before and after they
+change it and apply the difference with atomic F() increments, so concurrent
+writers never overwrite each other's totals.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F
+
+from . import fragments
+from .models import DraftExpense, DraftPayment, MonthlyFinanceSummary, Student
+
+CONFIRMED_PAYMENT_STATUSES = ['Paid', 'Half Paid', 'Accepted']
+
+STUDENT_STATUS_FIELDS = {
+    'Paid': 'paid_students',
+    'Half Paid': 'half_paid_students',
+    'Unpaid': 'unpaid_students',
+}
+
+
+def payment_contribution(payment):
+    """Return (year, month, amount) collected by a payment, or None."""
+    if not payment.student_id or payment.status not in CONFIRMED_PAYMENT_STATUSES:
+        return None
+    year, month = DraftPayment.normalize_month_year(payment.year, payment.month)
+    return int(year), int(month), Decimal(str(payment.amount))
+
+
+def expense_contribution(expense):
+    """Return (year, month, amount) spent by an expense, or None."""
+    if expense.status != 'Accepted':
+        return None
+    return int(expense.year), int(expense.month), Decimal(str(expense.amount))
+
+
+def student_contribution(student):
+    """Return (year, month, status) counted for a student's snapshot, or None."""
+    if not student.year or not student.month or student.payment_status not in STUDENT_STATUS_FIELDS:
+        return None
+    return int(student.year), int(student.month), student.payment_status
+
+
+def _increment(year, month, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    MonthlyFinanceSummary.objects.get_or_create(year=year, month=month)
+    MonthlyFinanceSummary.objects.filter(year=year, month=month).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    fragments.bump('MonthlyFinanceSummary')
+
+
+class SummaryChanges:
+    """
+    Accumulates contribution changes for many rows and applies them with one
+    F() update per affected month.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: defaultdict(int))
+
+    def _move_amount(self, field, before, after):
+        if before == after:
+            return self
+        if before:
+            self.deltas[(before[0], before[1])][field] -= before[2]
+        if after:
+            self.deltas[(after[0], after[1])][field] += after[2]
+        return self
+
+    def payment(self, before, after):
+        return self._move_amount('collected', before, after)
+
+    def expense(self, before, after):
+        return self._move_amount('expenses', before, after)
+
+    def student(self, before, after):
+        if before == after:
+            return self
+        if before:
+            self.deltas[(before[0], before[1])][STUDENT_STATUS_FIELDS[before[2]]] -= 1
+        if after:
+            self.deltas[(after[0], after[1])][STUDENT_STATUS_FIELDS[after[2]]] += 1
+        return self
+
+    def apply(self):
+        with transaction.atomic():
+            for (year, month), fields in sorted(self.deltas.items()):
+                _increment(year, month, **fields)
+        self.deltas.clear()
+
+
+def record_payment_change(before, after):
+    """Move a payment's contribution from `before` to `after`."""
+    SummaryChanges().payment(before, after).apply()
+
+
+def record_expense_change(before, after):
+    """Move an expense's contribution from `before` to `after`."""
+    SummaryChanges().expense(before, after).apply()
+
+
+def record_student_change(before, after):
+    """Move a student's snapshot from one (year, month, status) to another."""
+    SummaryChanges().student(before, after).apply()
+
+
+def record_student_removal(student):
+    """
+    Remove a student's snapshot and confirmed payments from the summary.
+    Call before deleting the student: their payments keep existing with no
+    student and stop counting as collected.
+    """
+    with transaction.atomic():
+        record_student_change(student_contribution(student), None)
+        payments = (
+            DraftPayment.objects.filter(student=student, status__in=CONFIRMED_PAYMENT_STATUSES)
+            .values('year', 'month').annotate(total=models.Sum('amount')).order_by()
+        )
+        for row in payments:
+            _increment(row['year'], row['month'], collected=-row['total'])
+
+
+def rebuild(year=None):
+    """Recompute the summary from raw payments, expenses and students."""
+    rows = defaultdict(lambda: {
+        'collected': Decimal('0'),
+        'expenses': Decimal('0'),
+        'paid_students': 0,
+        'half_paid_students': 0,
+        'unpaid_students': 0,
+    })
+
+    payments = DraftPayment.objects.filter(
+        status__in=CONFIRMED_PAYMENT_STATUSES, student__isnull=False
+    )
+    expenses = DraftExpense.objects.filter(status='Accepted')
+    students = Student.objects.filter(
+        year__isnull=False, month__isnull=False, payment_status__in=STUDENT_STATUS_FIELDS
+    )
+    if year is not None:
+        payments = payments.filter(year=year)
+        expenses = expenses.filter(year=year)
+        students = students.filter(year=year)
+
+    for row in payments.values('year', 'month').annotate(total=models.Sum('amount')).order_by():
+        rows[(row['year'], row['month'])]['collected'] = row['total']
+    for row in expenses.values('year', 'month').annotate(total=models.Sum('amount')).order_by():
+        rows[(row['year'], row['month'])]['expenses'] = row['total']
+    for row in students.values('year', 'month', 'payment_status').annotate(count=models.Count('id')).order_by():
+        rows[(row['year'], row['month'])][STUDENT_STATUS_FIELDS[row['payment_status']]] = row['count']
+
+    with transaction.atomic():
+        existing = MonthlyFinanceSummary.objects.all()
+        if year is not None:
+            existing = existing.filter(year=year)
+        existing.delete()
+        MonthlyFinanceSummary.objects.bulk_create([
+            MonthlyFinanceSummary(year=period_year, month=period_month, **values)
+            for (period_year, period_month), values in sorted(rows.items())
+        ])
+    fragments.bump('MonthlyFinanceSummary')
+    return len(rows)
@@ -0,0 +1,55 @@
+"""
+Template fragment caching keyed by per-model generation stamps.
+
+Each tracked model has a generation stamp in the shared default cache, bumped
+whenever rows of that model change. A fragment's cache key includes the stamps
+of the models it depends on, so cached HTML is reused until one of them
+changes; stale entries simply expire from the fragment cache. Hits and misses
+are counted in core.metrics per fragment.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from . import metrics
+
+GENERATION_KEY = 'core:generation:{}'
+
+
+def generations(model_names):
+    """Return the current stamp for each model name, creating missing ones."""
+    keys = [GENERATION_KEY.format(name) for name in model_names]
+    found = cache.get_many(keys)
+    stamps = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            found[key] = cache.get(key)
+        stamps.append(found[key])
+    return stamps
+
+
+def bump(*model_names):
+    """Invalidate every fragment that depends on any of these models."""
+    cache.set_many({GENERATION_KEY.format(name): uuid.uuid4().hex for name in model_names}, timeout=None)
+
+
+def fragment_key(name, model_names, vary_on=()):
+    vary = hashlib.md5(':'.join(str(value) for value in vary_on).encode()).hexdigest()
+    return f"core:fragment:{name}:{':'.join(generations(model_names))}:{vary}"
+
+
+def get_or_render(name, model_names, vary_on, render):
+    """Return the cached fragment, or render it with render() and cache it."""
+    fragment_cache = caches['fragments']
+    key = fragment_key(name, model_names, vary_on)
+    content = fragment_cache.get(key)
+    if content is not None:
+        metrics.inc('fragment_cache_hits_total', fragment=name)
+        return content
+    metrics.inc('fragment_cache_misses_total', fragment=name)
+    content = render()
+    fragment_cache.set(key, content, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+    return content
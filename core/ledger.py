@@ -0,0 +1,98 @@
+"""
+Maintenance of the StudentMonthlyStatus ledger.
+
+The payment flows upsert the row for a period from its running paid total
+(the sum of the student's confirmed payments towards it); backfill() rebuilds
+the whole ledger from DraftPayment history the same way.
+"""
+from django.db import models, transaction
+
+from . import fragments
+from .discount_calendar import get_calendar
+from .fees import payment_status_for, resolve_required_fee
+from .finance_summary import CONFIRMED_PAYMENT_STATUSES
+from .models import DraftPayment, Student, StudentMonthlyStatus
+
+BATCH_SIZE = 1000
+
+
+def _upsert(rows):
+    StudentMonthlyStatus.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['student', 'year', 'month'],
+        update_fields=['paid_amount', 'status', 'updated_date'],
+    )
+    fragments.bump('StudentMonthlyStatus')
+
+
+LEDGER_STATUSES = {status for status, _ in Student.PAYMENT_STATUS_CHOICES}
+
+
+def sync_students(students):
+    """
+    Write each student's current (year, month) snapshot into the ledger. The
+    payment flows only call this with snapshots that hold the period's running
+    total; a snapshot left with a legacy status outside the field's choices
+    ('Accepted') is not copied.
+    """
+    sync_periods(
+        (student.pk, student.year, student.month, student.paid_amount, student.payment_status)
+        for student in students
+        if student.payment_status in LEDGER_STATUSES
+    )
+
+
+def sync_periods(entries):
+    """Upsert (student_id, year, month, paid_amount, status) tuples into the ledger."""
+    _upsert([
+        StudentMonthlyStatus(
+            student_id=student_id, year=year, month=month, paid_amount=paid_amount, status=status,
+        )
+        for student_id, year, month, paid_amount, status in entries
+        if year and month
+    ])
+
+
+def backfill():
+    """
+    Rebuild the ledger from confirmed DraftPayment history. Each period's status
+    follows the add_payment rules against the discounted fee. A student's
+    current snapshot only fills in a period with no payment history.
+    """
+    calendar = get_calendar()
+    students = Student.objects.in_bulk()
+    totals = (
+        DraftPayment.objects.filter(status__in=CONFIRMED_PAYMENT_STATUSES, student__isnull=False)
+        .values('student_id', 'year', 'month').annotate(total=models.Sum('amount')).order_by()
+    )
+
+    rows = {}
+    for row in totals.iterator():
+        student = students[row['student_id']]
+        year, month = DraftPayment.normalize_month_year(row['year'], row['month'])
+        required_fee = resolve_required_fee(
+            student.monthly_fee,
+            student_discount=calendar.student_discount(student.pk, year, month),
+            holiday=calendar.holiday(year, month),
+        )
+        key = (student.pk, year, month)
+        paid_amount = row['total'] + (rows[key].paid_amount if key in rows else 0)
+        rows[key] = StudentMonthlyStatus(
+            student_id=student.pk, year=year, month=month,
+            paid_amount=paid_amount, status=payment_status_for(paid_amount, required_fee),
+        )
+    for student in students.values():
+        key = (student.pk, student.year, student.month)
+        if student.year and student.month and key not in rows and student.payment_status in LEDGER_STATUSES:
+            rows[key] = StudentMonthlyStatus(
+                student_id=student.pk, year=student.year, month=student.month,
+                paid_amount=student.paid_amount, status=student.payment_status,
+            )
+
+    with transaction.atomic():
+        StudentMonthlyStatus.objects.all().delete()
+        StudentMonthlyStatus.objects.bulk_create(rows.values(), batch_size=BATCH_SIZE)
+    fragments.bump('StudentMonthlyStatus')
+    return len(rows)
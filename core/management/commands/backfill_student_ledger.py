@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the StudentMonthlyStatus ledger from DraftPayment history.'
+
+    def handle(self, *args, **options):
+        count = ledger.backfill()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} ledger rows.'))
@@ -0,0 +1,60 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset in a throwaway test database and report per-URL '
+        'p50/p95 latency, query count and peak memory as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(bench.SCALES), default='1k')
+        parser.add_argument('--students', type=int, help='Override the number of students for --scale')
+        parser.add_argument('--years', type=int, default=1, help='Years of payment and expense history')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per URL')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--url', action='append', dest='urls', help='Only benchmark this URL name (repeatable)')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['years'] < 1:
+            raise CommandError('--requests and --years must be at least 1.')
+        students = options['students'] or bench.SCALES[options['scale']]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            dataset = bench.seed(students=students, years=options['years'], seed=options['seed'])
+            seed_seconds = time.perf_counter() - started
+            results = bench.run(dataset, requests=options['requests'], only=options['urls'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'scale': options['scale'] if not options['students'] else None,
+            'seed': options['seed'],
+            'requests': options['requests'],
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'dataset': dict(dataset.counts, years=options['years'], seed_seconds=round(seed_seconds, 2)),
+            **results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}."))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,65 @@
+import random
+import string
+import time
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import student_index
+from core.bench import BATCH_SIZE, percentile
+from core.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Measure autocomplete prefix-lookup latency against a synthetic student roster.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--database', action='store_true',
+            help='Also time the Lower(name) database fallback; the same names are inserted into '
+                 'the configured database and rolled back afterwards',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = set()
+        while len(names) < options['students']:
+            first = rng.choice(string.ascii_uppercase) + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+            last = rng.choice(string.ascii_uppercase) + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+            names.add(f'{first} {last}')
+        names = sorted(names)
+
+        started = time.perf_counter()
+        index = student_index.StudentNameIndex('bench', list(enumerate(names)))
+        build_ms = (time.perf_counter() - started) * 1000
+
+        queries = [rng.choice(names)[:rng.randint(1, 5)].lower() for _ in range(options['queries'])]
+        self.report('memory', index.prefix, queries)
+        self.stdout.write(f'  index build for {len(names)} students: {build_ms:.1f} ms')
+
+        if options['database']:
+            with transaction.atomic():
+                Student.objects.bulk_create(
+                    [Student(name=name, monthly_fee=Decimal('1000')) for name in names],
+                    batch_size=BATCH_SIZE, ignore_conflicts=True,
+                )
+                self.report('database', student_index.database_prefix, queries[:500])
+                transaction.set_rollback(True)
+
+    def report(self, label, lookup, queries):
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            lookup(query, limit=10)
+            samples.append((time.perf_counter() - started) * 1_000_000)
+        self.stdout.write(
+            f'{label}: {len(samples)} queries, '
+            f'p50 {percentile(samples, 0.50):.1f} us, '
+            f'p95 {percentile(samples, 0.95):.1f} us, '
+            f'p99 {percentile(samples, 0.99):.1f} us'
+        )
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec with per-request, persistent and pooled database '
+        'connections, using concurrent clients against a throwaway test database. '
+        'Point DATABASE_URL at a local PostgreSQL server for meaningful numbers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', dest='modes', choices=list(bench.CONNECTION_MODES),
+                            help='Only run this mode (repeatable)')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per client')
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError('--threads and --requests must be at least 1.')
+        modes = options['modes'] or list(bench.CONNECTION_MODES)
+
+        results = {}
+        skipped = {}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            dataset = bench.seed(students=options['students'], years=1, seed=options['seed'])
+            for mode in modes:
+                if mode == 'pool' and not bench.pooling_supported():
+                    skipped[mode] = 'needs PostgreSQL with psycopg[pool] installed'
+                    continue
+                results[mode] = bench.connection_throughput(
+                    dataset, mode, threads=options['threads'], requests=options['requests']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps({'database': connection.vendor, 'modes': results, 'skipped': skipped}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}."))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec of the HTMX lookup endpoints under many concurrent '
+        'users: sync views on a WSGI-style thread pool versus async views on an '
+        'ASGI event loop, against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', dest='servers', choices=['wsgi', 'asgi'],
+                            help='Only run this server model (repeatable)')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent users')
+        parser.add_argument('--requests', type=int, default=20, help='Lookups per user')
+        parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        if min(options['clients'], options['requests'], options['threads']) < 1:
+            raise CommandError('--clients, --requests and --threads must be at least 1.')
+        servers = options['servers'] or ['wsgi', 'asgi']
+
+        results = {}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            dataset = bench.seed(students=options['students'], years=1, seed=options['seed'])
+            if 'wsgi' in servers:
+                results['wsgi'] = bench.wsgi_concurrency(
+                    dataset, clients=options['clients'], requests=options['requests'], threads=options['threads']
+                )
+            if 'asgi' in servers:
+                results['asgi'] = bench.asgi_concurrency(
+                    dataset, clients=options['clients'], requests=options['requests']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps({'database': connection.vendor, 'servers': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}."))
+        else:
+            self.stdout.write(output)
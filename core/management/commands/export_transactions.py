@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Write confirmed payments or accepted expenses to a CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['payments', 'expenses'])
+        parser.add_argument('output', help='Path of the CSV file to write')
+        parser.add_argument('--year', type=int)
+        parser.add_argument('--month', type=int)
+        parser.add_argument('--student', help='Student id or name (payments only)')
+        parser.add_argument('--status')
+
+    def handle(self, *args, **options):
+        filters = {
+            'year': options['year'],
+            'month': options['month'],
+            'status': options['status'],
+        }
+        if options['kind'] == 'payments':
+            rows = exports.payment_rows(student=options['student'], **filters)
+        elif options['student']:
+            raise CommandError('--student only applies to payments.')
+        else:
+            rows = exports.expense_rows(**filters)
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+            count = exports.write_csv(rows, file)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} {options['kind']} to {options['output']}."))
@@ -0,0 +1,50 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import payment_import
+from core.student_import import read_csv, read_json
+
+
+class Command(BaseCommand):
+    help = 'Ingest payments from a bank or cashier statement (CSV, JSON or JSON Lines).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Statement file with student_id/student, amount, year, month columns')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--user', help='Username recorded on the created payments')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would happen without writing')
+        parser.add_argument('--report', help='Write a per-row CSV report to this path')
+
+    def handle(self, *args, **options):
+        path = options['input']
+        file_format = options['format'] or ('json' if path.lower().endswith(('.json', '.jsonl')) else 'csv')
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Unknown user: {options['user']}")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as source:
+                reader = read_json if file_format == 'json' else read_csv
+                result = payment_import.ingest_payments(reader(source), user=user, dry_run=options['dry_run'])
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        except ValueError as error:
+            raise CommandError(f'Cannot parse {path}: {error}')
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(payment_import.REPORT_COLUMNS)
+                writer.writerows(entry.report_row() for entry in result.entries)
+
+        for entry in result.rejected:
+            self.stdout.write(self.style.WARNING(f'Line {entry.line}: {entry.error}'))
+        verb = 'Would create' if result.dry_run else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(result.accepted)} payments totalling Rs.{result.total_amount}; '
+            f'rejected {len(result.rejected)} rows.'
+        ))
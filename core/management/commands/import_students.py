@@ -0,0 +1,55 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import student_import
+
+
+class Command(BaseCommand):
+    help = 'Import students from a CSV or JSON file with name and monthly_fee columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Path of the CSV, JSON or JSON Lines file to read')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=student_import.CHUNK_SIZE)
+        parser.add_argument('--upsert', action='store_true', help='Update monthly_fee of students that already exist')
+        parser.add_argument('--rejects', help='CSV file for rejected rows (default: <input>.rejects.csv)')
+
+    def handle(self, *args, **options):
+        path = options['input']
+        file_format = options['format'] or ('json' if path.lower().endswith(('.json', '.jsonl')) else 'csv')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        rejects_path = options['rejects'] or f'{path}.rejects.csv'
+
+        try:
+            source = open(path, newline='', encoding='utf-8-sig')
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+
+        started = time.monotonic()
+        with source, open(rejects_path, 'w', newline='', encoding='utf-8') as rejects_file:
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(student_import.REJECT_COLUMNS)
+            reader = student_import.read_json if file_format == 'json' else student_import.read_csv
+            try:
+                result = student_import.import_students(
+                    reader(source),
+                    chunk_size=options['chunk_size'],
+                    upsert=options['upsert'],
+                    rejects=rejects,
+                )
+            except ValueError as error:
+                raise CommandError(f'Cannot parse {path}: {error}')
+        if not result.rejected:
+            os.remove(rejects_path)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated}, unchanged {result.unchanged} '
+            f'students in {elapsed:.1f}s.'
+        ))
+        if result.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {result.rejected} rows; see {rejects_path}.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import finance_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MonthlyFinanceSummary rollup from payments, expenses and students.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+
+    def handle(self, *args, **options):
+        count = finance_summary.rebuild(year=options['year'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} monthly summary rows.'))
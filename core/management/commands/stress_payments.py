@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Have concurrent writers take part-payments for the same students in a throwaway '
+        'test database, then check that no update was lost and report payments/sec. '
+        'Point DATABASE_URL at a local PostgreSQL server for meaningful numbers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Concurrent writer threads')
+        parser.add_argument('--payments', type=int, default=50, help='Payments per writer')
+        parser.add_argument('--students', type=int, default=1, help='Students the payments are spread over')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        if min(options['writers'], options['payments'], options['students']) < 1:
+            raise CommandError('--writers, --payments and --students must be at least 1.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            result = bench.payment_contention(
+                writers=options['writers'], payments=options['payments'], students=options['students']
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps({'database': connection.vendor, **result}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote stress report to {options['output']}."))
+        else:
+            self.stdout.write(output)
+        if result['lost_updates']:
+            raise CommandError(f"{len(result['lost_updates'])} students lost updates.")
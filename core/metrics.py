@@ -0,0 +1,196 @@
+"""
+In-process metrics registry with a text exposition format.
+
+Counters and fixed-bucket histograms are kept per process behind a lock. In
+the default 'process' mode the metrics endpoint shows this process only. In
+'file' mode (METRICS_MODE=file) each process also writes its registry to
+METRICS_DIR/metrics-<pid>.json at most every METRICS_FLUSH_SECONDS, and the
+endpoint sums the files of all workers, including ones that have exited.
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+# Upper bounds in seconds; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by URL name and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by URL name and status code.'),
+    'db_queries_total': ('counter', 'Database queries by URL name.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in database queries by URL name.'),
+    'payments_created_total': ('counter', 'Payments entered through the form or a statement import.'),
+    'payments_accepted_total': ('counter', 'Payments accepted by staff.'),
+    'payments_declined_total': ('counter', 'Payments declined by staff.'),
+    'expenses_approved_total': ('counter', 'Expenses approved by staff.'),
+    'expenses_declined_total': ('counter', 'Expenses declined by staff.'),
+    'fragment_cache_hits_total': ('counter', 'Template fragments served from the fragment cache.'),
+    'fragment_cache_misses_total': ('counter', 'Template fragments rendered and stored in the fragment cache.'),
+    'pending_payments': ('gauge', 'Payments waiting for approval.'),
+    'pending_expenses': ('gauge', 'Expenses waiting for approval.'),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # key -> [bucket counts..., +Inf count], sum
+        self.histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += amount
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            buckets, total = self.histograms.get(key) or ([0] * (len(LATENCY_BUCKETS) + 1), 0.0)
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    break
+            else:
+                position = len(LATENCY_BUCKETS)
+            buckets[position] += 1
+            self.histograms[key] = (buckets, total + value)
+
+    def snapshot(self):
+        """A JSON-serialisable copy of the registry."""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, list(labels), list(buckets), total]
+                    for (name, labels), (buckets, total) in self.histograms.items()
+                ],
+            }
+
+
+def merge(snapshots):
+    """Sum several registry snapshots into one."""
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, buckets, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged, merged_total = histograms.get(key) or ([0] * len(buckets), 0.0)
+            histograms[key] = ([a + b for a, b in zip(merged, buckets)], merged_total + total)
+    return counters, histograms
+
+
+registry = Registry()
+
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _file_mode():
+    return getattr(settings, 'METRICS_MODE', 'process') == 'file'
+
+
+def _path():
+    return os.path.join(settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+
+
+def flush(force=False):
+    """In file mode, write this process's registry for other workers to read."""
+    global _last_flush
+    if not _file_mode():
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+        return
+    with _flush_lock:
+        _last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=settings.METRICS_DIR, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(registry.snapshot(), file)
+        os.replace(temporary, _path())
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+    flush()
+
+
+def inc_on_commit(name, amount=1, **labels):
+    """Count a domain event only once its transaction has committed."""
+    if amount:
+        transaction.on_commit(lambda: inc(name, amount, **labels))
+
+
+def observe_request(view, status, seconds, queries, db_seconds):
+    labels = {'view': view or 'unmatched'}
+    registry.inc('http_requests_total', status=str(status), **labels)
+    registry.observe('http_request_duration_seconds', seconds, status=str(status), **labels)
+    registry.inc('db_queries_total', queries, **labels)
+    registry.inc('db_query_duration_seconds_total', db_seconds, **labels)
+    flush()
+
+
+def collect():
+    """Merge the metrics of every process that shares METRICS_DIR, or just this one."""
+    if not _file_mode():
+        return merge([registry.snapshot()])
+    flush(force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return merge(snapshots)
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(counters, histograms, gauges=None):
+    """Render merged metrics in the Prometheus text exposition format."""
+    gauges = gauges or {}
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'gauge':
+            if name in gauges:
+                lines.append(f'{name} {_number(gauges[name])}')
+        elif kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        else:
+            for (metric, labels), (buckets, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:47
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+STUDENT_STATUS_FIELDS = {
+    'Paid': 'paid_students',
+    'Half Paid': 'half_paid_students',
+    'Unpaid': 'unpaid_students',
+}
+
+
+def fill_summary(apps, schema_editor):
+    # finance_summary.rebuild() against this migration's schema: the current
+    # models have columns (DraftExpense.year/month) that do not exist yet here
+    DraftPayment = apps.get_model('core', 'DraftPayment')
+    DraftExpense = apps.get_model('core', 'DraftExpense')
+    Student = apps.get_model('core', 'Student')
+    MonthlyFinanceSummary = apps.get_model('core', 'MonthlyFinanceSummary')
+
+    rows = defaultdict(dict)
+    payments = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted'], student__isnull=False)
+    for row in payments.values('year', 'month').annotate(total=models.Sum('amount')).order_by():
+        rows[(row['year'], row['month'])]['collected'] = row['total']
+    expenses = (
+        DraftExpense.objects.filter(status='Accepted')
+        .annotate(period_year=ExtractYear('created_time'), period_month=ExtractMonth('created_time'))
+        .values('period_year', 'period_month').annotate(total=models.Sum('amount')).order_by()
+    )
+    for row in expenses:
+        rows[(row['period_year'], row['period_month'])]['expenses'] = row['total']
+    students = Student.objects.filter(
+        year__isnull=False, month__isnull=False, payment_status__in=STUDENT_STATUS_FIELDS
+    )
+    for row in students.values('year', 'month', 'payment_status').annotate(count=models.Count('id')).order_by():
+        rows[(row['year'], row['month'])][STUDENT_STATUS_FIELDS[row['payment_status']]] = row['count']
+
+    MonthlyFinanceSummary.objects.bulk_create([
+        MonthlyFinanceSummary(year=year, month=month, **values)
+        for (year, month), values in sorted(rows.items())
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField(choices=[(1, 'January'), (2, 'February'), (3, 'March'), (4, 'April'), (5, 'May'), (6, 'June'), (7, 'July'), (8, 'August'), (9, 'September'), (10, 'October'), (11, 'November'), (12, 'December')])),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid_students', models.IntegerField(default=0)),
+                ('half_paid_students', models.IntegerField(default=0)),
+                ('unpaid_students', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'core_monthlyfinancesummary',
+                'ordering': ['year', 'month'],
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
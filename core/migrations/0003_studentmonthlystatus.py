@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.fees import payment_status_for, resolve_required_fee
+
+
+def normalize_month_year(year, month):
+    total = (int(year) * 12) + (int(month) - 1)
+    return total // 12, (total % 12) + 1
+
+
+def backfill_ledger(apps, schema_editor):
+    # ledger.backfill() against this migration's schema: the current models
+    # (and the discount calendar built from them) have columns added later
+    DraftPayment = apps.get_model('core', 'DraftPayment')
+    HolidayMonth = apps.get_model('core', 'HolidayMonth')
+    Student = apps.get_model('core', 'Student')
+    StudentDiscount = apps.get_model('core', 'StudentDiscount')
+    StudentMonthlyStatus = apps.get_model('core', 'StudentMonthlyStatus')
+
+    holidays = {(holiday.year, holiday.month): holiday for holiday in HolidayMonth.objects.all()}
+    discounts = {
+        (discount.student_id, discount.year, discount.month): discount
+        for discount in StudentDiscount.objects.all()
+    }
+    students = Student.objects.in_bulk()
+    totals = (
+        DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted'], student__isnull=False)
+        .values('student_id', 'year', 'month').annotate(total=models.Sum('amount')).order_by()
+    )
+
+    rows = {}
+    for row in totals.iterator():
+        student = students[row['student_id']]
+        year, month = normalize_month_year(row['year'], row['month'])
+        required_fee = resolve_required_fee(
+            student.monthly_fee,
+            student_discount=discounts.get((student.pk, year, month)),
+            holiday=holidays.get((year, month)),
+        )
+        key = (student.pk, year, month)
+        paid_amount = row['total'] + (rows[key].paid_amount if key in rows else 0)
+        rows[key] = StudentMonthlyStatus(
+            student_id=student.pk, year=year, month=month,
+            paid_amount=paid_amount, status=payment_status_for(paid_amount, required_fee),
+        )
+    for student in students.values():
+        key = (student.pk, student.year, student.month)
+        if student.year and student.month and key not in rows and student.payment_status in ('Unpaid', 'Half Paid', 'Paid'):
+            rows[key] = StudentMonthlyStatus(
+                student_id=student.pk, year=student.year, month=student.month,
+                paid_amount=student.paid_amount, status=student.payment_status,
+            )
+    StudentMonthlyStatus.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_monthlyfinancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentMonthlyStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('Unpaid', 'Unpaid'), ('Half Paid', 'Half Paid'), ('Paid', 'Paid')], default='Unpaid', max_length=20)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_statuses', to='core.student')),
+            ],
+            options={
+                'db_table': 'core_studentmonthlystatus',
+                'ordering': ['student', 'year', 'month'],
+                'indexes': [models.Index(fields=['year', 'month', 'status'], name='core_studen_year_a5a6ff_idx')],
+                'unique_together': {('student', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:54
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_studentmonthlystatus'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='core_student_name_lower_idx'),
+        ),
+    ]
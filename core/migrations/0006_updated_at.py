@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+# Existing rows start out "last modified" when they were created
+CREATED_FIELDS = {
+    'DraftPayment': 'created_date',
+    'DraftExpense': 'created_time',
+    'Student': 'created_date',
+    'HolidayMonth': 'created_date',
+    'StudentDiscount': 'created_date',
+}
+
+
+def copy_created_dates(apps, schema_editor):
+    for model_name, created_field in CREATED_FIELDS.items():
+        apps.get_model('core', model_name).objects.update(updated_at=F(created_field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_student_period_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draftpayment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='draftexpense',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='holidaymonth',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='studentdiscount',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='draftexpense',
+            index=models.Index(fields=['status', 'created_time', 'id'], name='core_expense_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftpayment',
+            index=models.Index(fields=['status', 'created_date'], name='core_payment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftpayment',
+            index=models.Index(fields=['created_date', 'id'], name='core_payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftpayment',
+            index=models.Index(condition=models.Q(('status__in', ['Draft', 'Half Paid', 'Paid'])), fields=['created_date', 'id'], name='core_payment_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftpayment',
+            index=models.Index(fields=['year', 'month'], name='core_payment_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftpayment',
+            index=models.Index(fields=['student', 'year', 'month'], name='core_payment_student_idx'),
+        ),
+    ]
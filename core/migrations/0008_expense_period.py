@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def book_to_entry_month(apps, schema_editor):
+    # Extract in the current timezone, as DraftExpense.entry_period() does
+    apps.get_model('core', 'DraftExpense').objects.update(
+        year=ExtractYear('created_time'),
+        month=ExtractMonth('created_time'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_payment_expense_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draftexpense',
+            name='year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='draftexpense',
+            name='month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(book_to_entry_month, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='draftexpense',
+            name='year',
+            field=models.IntegerField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='draftexpense',
+            name='month',
+            field=models.IntegerField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='draftexpense',
+            index=models.Index(fields=['status', 'year', 'month'], name='core_expense_period_idx'),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import date
 
+# Payments waiting for an admin to accept or decline them
+PENDING_PAYMENT_STATUSES = ['Draft', 'Half Paid', 'Paid']
+
 def get_first_of_month():
     return date.today().replace(day=1)
 
@@ -25,6 +29,26 @@ class DraftPayment(models.Model):
     year = models.IntegerField()
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_column='user_id')
     oath_user = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Serves status counts and single-status filters
+            models.Index(fields=['status', 'created_date'], name='core_payment_status_date_idx'),
+            # Serves the newest-first lists, read in index order up to the page size
+            models.Index(fields=['created_date', 'id'], name='core_payment_created_idx'),
+            # The approval queue is a small slice of the table once payments get
+            # accepted; backends that bind parameters before planning (PostgreSQL)
+            # read it from this partial index
+            models.Index(
+                fields=['created_date', 'id'], name='core_payment_pending_idx',
+                condition=models.Q(status__in=PENDING_PAYMENT_STATUSES),
+            ),
+            # Serves the yearly analysis, exports and summary rebuilds by period
+            models.Index(fields=['year', 'month'], name='core_payment_period_idx'),
+            # Serves per-student period lookups (ledger, student history)
+            models.Index(fields=['student', 'year', 'month'], name='core_payment_student_idx'),
+        ]
 
     def __str__(self):
         return f"Payment: {self.student.name if self.student else 'Unknown'} - {self.amount} ({self.status})"
@@ -39,29 +63,29 @@ class DraftPayment(models.Model):
         # Normalize month/year in case month goes beyond 12 (e.g., 13 => Jan next year)
         self.year, self.month = DraftPayment.normalize_month_year(self.year, self.month)
 
-        # When payment is accepted, process the payment logic
-        if self.status == 'Accepted' and self.student:
-            self.process_payment()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # When payment is accepted, process the payment logic; it reads the
+            # saved amount as part of its period's running total
+            if self.status == 'Accepted' and self.student_id:
+                self.process_payment()
 
     def process_payment(self):
-        """Process payment acceptance and update student's monthly status"""
-        if not self.student:
+        """
+        Re-derive the student's standing for this payment's period from the
+        period's running total. The payment's own amount never replaces it.
+        """
+        if not self.student_id:
             return
 
-        # Ensure valid month/year before updating student status
-        self.year, self.month = DraftPayment.normalize_month_year(self.year, self.month)
-
-        # Use payment's monthly_fee if set, otherwise fall back to student's monthly_fee
-        monthly_fee = self.monthly_fee if self.monthly_fee else self.student.monthly_fee
-        amount_paid = self.amount
-
-        # Update student's monthly payment status directly
-        self.student.year = self.year
-        self.student.month = self.month
-        self.student.paid_amount = amount_paid
-        self.student.payment_status = self.status
-        self.student.save()
+        # Update student's monthly payment status directly, with their row locked
+        # (core.payments imports this module)
+        from .payments import lock_student, save_snapshot, settle_periods
+        with transaction.atomic():
+            self.student = lock_student(self.student_id)
+            snapshots = settle_periods({self.student.pk: self.student}, [(self.student.pk, self.year, self.month)])
+            if self.student.pk in snapshots:
+                save_snapshot(self.student, *snapshots[self.student.pk])
 
     @staticmethod
     def normalize_month_year(year, month):
@@ -114,10 +138,34 @@ class DraftExpense(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_column='user_id')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Draft')
     oath_user = models.CharField(max_length=255, blank=True, null=True)
+    # Accounting period the expense is booked to; the month it was entered in unless given
+    year = models.IntegerField(blank=True)
+    month = models.IntegerField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Serves the draft and accepted lists newest first
+            models.Index(fields=['status', 'created_time', 'id'], name='core_expense_status_time_idx'),
+            # Serves yearly and monthly expense reporting by accounting period
+            models.Index(fields=['status', 'year', 'month'], name='core_expense_period_idx'),
+        ]
 
     def __str__(self):
         return f"Expense: {self.name} - {self.amount} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        if self.year is None or self.month is None:
+            self.year, self.month = self.entry_period()
+        super().save(*args, **kwargs)
+
+    def entry_period(self):
+        """(year, month) of created_time in the local timezone"""
+        created_time = self.created_time
+        if timezone.is_aware(created_time):
+            created_time = timezone.localtime(created_time)
+        return created_time.year, created_time.month
+
 class Student(models.Model):
     """
     Student model with integrated monthly payment tracking.
@@ -138,17 +186,45 @@ class Student(models.Model):
     month = models.IntegerField(null=True, blank=True)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='Unpaid')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = 'core_student'
         indexes = [
             models.Index(fields=['name']),
+            # Serves case-insensitive prefix lookups (autocomplete database fallback)
+            models.Index(Lower('name'), name='core_student_name_lower_idx'),
+            # Serves "who has not paid for this month" searches
+            models.Index(fields=['year', 'month', 'payment_status'], name='core_student_period_idx'),
         ]
 
     def __str__(self):
         return self.name
 
 
+class StudentMonthlyStatus(models.Model):
+    """
+    Payment ledger with one row per student and period. Student only keeps the
+    latest period; this table keeps every period the student has paid towards.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='monthly_statuses')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    status = models.CharField(max_length=20, choices=Student.PAYMENT_STATUS_CHOICES, default='Unpaid')
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_studentmonthlystatus'
+        unique_together = ['student', 'year', 'month']
+        ordering = ['student', 'year', 'month']
+        indexes = [
+            models.Index(fields=['year', 'month', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.month}/{self.year} ({self.status})"
+
 class HolidayMonth(models.Model):
     """
     Holiday months where students don't need to pay fees.
@@ -181,6 +257,7 @@ class HolidayMonth(models.Model):
     discount_value = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Value for percentage or amount discount")
     
     created_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = 'core_holidaymonth'
@@ -212,6 +289,7 @@ class StudentDiscount(models.Model):
     discount_value = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Value for percentage or amount discount")
     
     created_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = 'core_studentdiscount'
@@ -229,3 +307,25 @@ class StudentDiscount(models.Model):
     def month_name(self):
         return self.get_month_display()
 
+
+class MonthlyFinanceSummary(models.Model):
+    """
+    Per-month rollup of confirmed payments, accepted expenses and student payment
+    statuses. Kept up to date incrementally by the payment and expense flows and
+    rebuilt from scratch by the rebuild_finance_summary command.
+    """
+    year = models.IntegerField()
+    month = models.IntegerField(choices=HolidayMonth.MONTH_CHOICES)
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    expenses = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_students = models.IntegerField(default=0)
+    half_paid_students = models.IntegerField(default=0)
+    unpaid_students = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'core_monthlyfinancesummary'
+        unique_together = ['year', 'month']
+        ordering = ['year', 'month']
+
+    def __str__(self):
+        return f"Summary {self.get_month_display()} {self.year}"
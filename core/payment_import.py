@@ -0,0 +1,185 @@
+"""
+Bulk ingestion of payments from bank or cashier statement files.
+
+A statement has one payment per row with `student_id` and/or `student` (name),
+`amount`, `year`, `month` and an optional `description`. Rows are matched to
+students through one preloaded name/id dictionary, every period is priced with
+one calculate_required_fees() call, and each row then goes through the same
+status rules as add_payment, in file order. Everything is written in one
+transaction with bulk_create/bulk_update; a dry run stops before writing.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import finance_summary, fragments, ledger, metrics
+from .fees import calculate_required_fees, payment_status_for
+from .payments import period_totals
+from .models import DraftPayment, Student
+
+REPORT_COLUMNS = ['line', 'student', 'year', 'month', 'amount', 'required_fee', 'status', 'error']
+
+
+class StatementEntry:
+    def __init__(self, line, reference, amount=None, year=None, month=None, description=None, error=None):
+        self.line = line
+        self.reference = reference
+        self.amount = amount
+        self.year = year
+        self.month = month
+        self.description = description
+        self.error = error
+        self.student = None
+        self.required_fee = None
+        self.status = None
+
+    def report_row(self):
+        return [
+            self.line,
+            self.student.name if self.student else self.reference,
+            self.year, self.month, self.amount, self.required_fee, self.status, self.error or '',
+        ]
+
+
+class IngestResult:
+    def __init__(self, entries, dry_run):
+        self.entries = entries
+        self.dry_run = dry_run
+
+    @property
+    def accepted(self):
+        return [entry for entry in self.entries if not entry.error]
+
+    @property
+    def rejected(self):
+        return [entry for entry in self.entries if entry.error]
+
+    @property
+    def total_amount(self):
+        return sum((entry.amount for entry in self.accepted), Decimal('0'))
+
+
+def parse_entry(line, row):
+    """Turn one statement row into a StatementEntry, recording any validation error."""
+    if not isinstance(row, dict):
+        return StatementEntry(line, '', error='Row is not an object')
+    reference = str(row.get('student_id') or row.get('student') or '').strip()
+    entry = StatementEntry(line, reference, description=(row.get('description') or None))
+    if not reference:
+        entry.error = 'Missing student'
+        return entry
+    try:
+        entry.amount = Decimal(str(row.get('amount')).strip())
+    except InvalidOperation:
+        entry.error = f"Invalid amount: {row.get('amount')}"
+        return entry
+    if not entry.amount.is_finite() or entry.amount <= 0:
+        entry.error = f"Invalid amount: {row.get('amount')}"
+        return entry
+    try:
+        year, month = int(row.get('year')), int(row.get('month'))
+    except (TypeError, ValueError):
+        entry.error = 'Invalid year or month'
+        return entry
+    entry.year, entry.month = DraftPayment.normalize_month_year(year, month)
+    return entry
+
+
+class StudentDirectory:
+    """Every student's id and name in memory, for matching statement rows."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        for pk, name in Student.objects.values_list('id', 'name').iterator():
+            self.by_id[pk] = pk
+            self.by_name[name] = pk
+            self.by_name.setdefault(name.casefold(), pk)
+
+    def match(self, row):
+        student_id = str(row.get('student_id') or '').strip()
+        if student_id:
+            try:
+                return self.by_id.get(int(student_id))
+            except ValueError:
+                return None
+        name = str(row.get('student') or '').strip()
+        return self.by_name.get(name) or self.by_name.get(name.casefold())
+
+
+def ingest_payments(rows, user=None, dry_run=False):
+    """Ingest (line, row) pairs from a statement and return an IngestResult."""
+    directory = StudentDirectory()
+    entries = []
+    student_ids = {}
+    for line, row in rows:
+        entry = parse_entry(line, row)
+        if not entry.error:
+            student_ids[line] = directory.match(row)
+            if student_ids[line] is None:
+                entry.error = f'Unknown student: {entry.reference}'
+        entries.append(entry)
+
+    with transaction.atomic():
+        # A dry run only reads, so it takes no row locks
+        students = Student.objects.all() if dry_run else Student.objects.select_for_update()
+        students = students.in_bulk({pk for pk in student_ids.values() if pk is not None})
+        valid = [entry for entry in entries if not entry.error]
+        fees = {}
+        if valid:
+            periods = [(entry.year, entry.month) for entry in valid]
+            fees = calculate_required_fees(students.values(), min(periods), max(periods))
+
+        # Running totals per period, carried forward across rows of the same file
+        running = period_totals({(student_ids[entry.line], entry.year, entry.month) for entry in valid})
+
+        changes = finance_summary.SummaryChanges()
+        payments = []
+        ledger_rows = {}
+        for entry in valid:
+            student = students[student_ids[entry.line]]
+            entry.student = student
+            if student.year == entry.year and student.month == entry.month and student.payment_status in ['Paid', 'Accepted']:
+                entry.error = f'{entry.month}/{entry.year} is already {student.payment_status}'
+                continue
+
+            entry.required_fee = fees[(student.pk, entry.year, entry.month)]
+            key = (student.pk, entry.year, entry.month)
+            total_paid = running[key] + entry.amount
+            entry.status = payment_status_for(total_paid, entry.required_fee)
+            if entry.status != 'Unpaid':
+                running[key] = total_paid
+
+            before = finance_summary.student_contribution(student)
+            student.year = entry.year
+            student.month = entry.month
+            student.paid_amount = total_paid if entry.status != 'Unpaid' else Decimal('0')
+            student.payment_status = entry.status
+            student.updated_at = timezone.now()
+            changes.student(before, finance_summary.student_contribution(student))
+            ledger_rows[(student.pk, student.year, student.month)] = (
+                student.pk, student.year, student.month, student.paid_amount, student.payment_status
+            )
+
+            payment = DraftPayment(
+                user=user, student=student, amount=entry.amount, monthly_fee=student.monthly_fee,
+                description=entry.description, month=entry.month, year=entry.year, status=entry.status,
+            )
+            changes.payment(None, finance_summary.payment_contribution(payment))
+            payments.append(payment)
+
+        if not dry_run:
+            touched = {payment.student_id for payment in payments}
+            DraftPayment.objects.bulk_create(payments, batch_size=ledger.BATCH_SIZE)
+            Student.objects.bulk_update(
+                [students[pk] for pk in touched], ['year', 'month', 'paid_amount', 'payment_status', 'updated_at'],
+                batch_size=ledger.BATCH_SIZE,
+            )
+            ledger.sync_periods(ledger_rows.values())
+            changes.apply()
+            metrics.inc_on_commit('payments_created_total', len(payments))
+            # bulk writes send no signals
+            fragments.bump('Student', 'DraftPayment')
+            transaction.on_commit(lambda: fragments.bump('Student', 'DraftPayment'))
+    return IngestResult(entries, dry_run)
@@ -0,0 +1,154 @@
+"""
+Applying a payment to a student's monthly snapshot.
+
+Cashiers can take part-payments for the same student at the same moment, and
+each one adds to the snapshot's paid_amount. The student row is therefore
+locked with SELECT ... FOR UPDATE and re-read before the new total is worked
+out, so concurrent payments queue on the row instead of overwriting each
+other. Only the snapshot columns are written back.
+
+What a student has paid towards a period is always the running total of their
+confirmed payments for it. Accepting a payment re-derives the standing of its
+period from that total; it never replaces the total with the one payment's
+amount.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from . import finance_summary, ledger, metrics
+from .discount_calendar import get_calendar
+from .fees import calculate_required_fees, payment_status_for, period_index
+from .finance_summary import CONFIRMED_PAYMENT_STATUSES
+from .models import DraftPayment, Student
+
+SNAPSHOT_FIELDS = ['year', 'month', 'paid_amount', 'payment_status', 'updated_at']
+
+
+class PaymentRejected(Exception):
+    """The payment cannot be taken; the message is shown to the cashier."""
+
+
+def lock_student(student_id):
+    """Re-read the student with their row locked until the transaction ends."""
+    return Student.objects.select_for_update().get(pk=student_id)
+
+
+def save_snapshot(student, year, month, paid_amount, status):
+    """Point a locked student's snapshot at a period and mirror it into the summary and ledger."""
+    before = finance_summary.student_contribution(student)
+    student.year = year
+    student.month = month
+    student.paid_amount = paid_amount
+    student.payment_status = status
+    student.save(update_fields=SNAPSHOT_FIELDS)
+    finance_summary.record_student_change(before, finance_summary.student_contribution(student))
+    ledger.sync_students([student])
+
+
+def period_totals(keys):
+    """
+    Running paid totals for (student_id, year, month) keys: the sum of each
+    student's confirmed payments towards that period, read in one query.
+    """
+    totals = {key: Decimal('0') for key in keys}
+    if not totals:
+        return totals
+    rows = (
+        DraftPayment.objects.filter(
+            student_id__in={key[0] for key in totals},
+            year__in={key[1] for key in totals},
+            month__in={key[2] for key in totals},
+            status__in=CONFIRMED_PAYMENT_STATUSES,
+        )
+        .values('student_id', 'year', 'month').annotate(total=Sum('amount')).order_by()
+    )
+    for row in rows:
+        key = (row['student_id'], row['year'], row['month'])
+        if key in totals:
+            totals[key] = row['total']
+    return totals
+
+
+def period_standing(student, year, month, total, calendar=None):
+    """(paid_amount, status) recorded for a period given its running total."""
+    required_fee = calculate_required_fees([student], (year, month), (year, month), calendar=calendar)[
+        (student.pk, year, month)
+    ]
+    status = payment_status_for(total, required_fee)
+    return (total if status != 'Unpaid' else Decimal('0')), status
+
+
+def settle_periods(students, keys):
+    """
+    Re-derive standing after payments towards (student_id, year, month) keys
+    were accepted or adjusted. `students` maps ids to Student rows the caller
+    has locked. Every ledger row is rewritten from its period's running total.
+    Returns {student_id: (year, month, paid_amount, status)} for the snapshots
+    to update: the latest settled period, unless the snapshot already points at
+    a later one, so accepting an old payment never moves it back.
+    """
+    calendar = get_calendar()
+    standings = {
+        (student_id, year, month): period_standing(students[student_id], year, month, total, calendar)
+        for (student_id, year, month), total in period_totals(keys).items()
+    }
+    ledger.sync_periods(
+        (student_id, year, month, paid_amount, status)
+        for (student_id, year, month), (paid_amount, status) in standings.items()
+    )
+
+    snapshots = {}
+    for (student_id, year, month), (paid_amount, status) in sorted(standings.items()):
+        student = students[student_id]
+        if student.year and student.month and period_index(year, month) < period_index(student.year, student.month):
+            continue
+        snapshots[student_id] = (year, month, paid_amount, status)
+    return snapshots
+
+
+def apply_payment(student_id, amount, month, year, user=None, monthly_fee=None, description=None):
+    """
+    Record a payment towards (year, month) and add it to what the student has
+    already paid for that period. Returns the new DraftPayment, or raises
+    PaymentRejected if the period is already paid. Raises Student.DoesNotExist
+    for an unknown student and ValueError for an unusable amount or period.
+    """
+    try:
+        amount = Decimal(str(amount))
+    except ArithmeticError:
+        raise ValueError(f'Invalid amount: {amount}')
+    target_year, target_month = DraftPayment.normalize_month_year(year, month)
+    if not isinstance(target_month, int):
+        raise ValueError(f'Invalid period: {month}/{year}')
+
+    with transaction.atomic():
+        student = lock_student(student_id)
+        if student.year == target_year and student.month == target_month and student.payment_status in ['Paid', 'Accepted']:
+            raise PaymentRejected(
+                f"Cannot create new payment for {target_month}/{target_year} - payment is already {student.payment_status}."
+            )
+
+        required_fee = calculate_required_fees([student], (target_year, target_month), (target_year, target_month))[
+            (student.pk, target_year, target_month)
+        ]
+        # Read under the lock, so a concurrent part-payment has already been added
+        key = (student.pk, target_year, target_month)
+        total_paid = period_totals([key])[key] + amount
+        status = payment_status_for(total_paid, required_fee)
+        save_snapshot(student, target_year, target_month, total_paid if status != 'Unpaid' else Decimal('0'), status)
+
+        payment = DraftPayment.objects.create(
+            user=user,
+            student=student,
+            amount=amount,
+            monthly_fee=monthly_fee or student.monthly_fee,
+            description=description,
+            month=month,
+            year=year,
+            status=status
+        )
+        finance_summary.record_payment_change(None, finance_summary.payment_contribution(payment))
+        metrics.inc_on_commit('payments_created_total')
+    return payment
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import discount_calendar, fragments, student_index
+from .models import DraftExpense, DraftPayment, HolidayMonth, Student, StudentDiscount
+
+
+@receiver(post_save, sender=HolidayMonth)
+@receiver(post_delete, sender=HolidayMonth)
+@receiver(post_save, sender=StudentDiscount)
+@receiver(post_delete, sender=StudentDiscount)
+def invalidate_discount_calendar(sender, **kwargs):
+    # Invalidate right away so the current request sees its own change, and again
+    # after commit so no other worker keeps a calendar built before the commit.
+    discount_calendar.invalidate()
+    transaction.on_commit(discount_calendar.invalidate)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_index_on_save(sender, instance, created, update_fields=None, **kwargs):
+    # Payment flows save students all the time; only a new or renamed student
+    # changes the autocomplete index.
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    if not created and student_index.is_current(instance):
+        return
+    student_index.invalidate()
+    transaction.on_commit(student_index.invalidate)
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_student_index_on_delete(sender, **kwargs):
+    student_index.invalidate()
+    transaction.on_commit(student_index.invalidate)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=DraftPayment)
+@receiver(post_delete, sender=DraftPayment)
+@receiver(post_save, sender=DraftExpense)
+@receiver(post_delete, sender=DraftExpense)
+@receiver(post_save, sender=HolidayMonth)
+@receiver(post_delete, sender=HolidayMonth)
+@receiver(post_save, sender=StudentDiscount)
+@receiver(post_delete, sender=StudentDiscount)
+def bump_fragment_generation(sender, **kwargs):
+    fragments.bump(sender.__name__)
+    transaction.on_commit(lambda: fragments.bump(sender.__name__))
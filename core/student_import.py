@@ -0,0 +1,158 @@
+"""
+Bulk import of students from CSV or JSON.
+
+Rows are read one at a time, validated in memory against the names already in
+core_student (and earlier rows of the same file), and written with bulk_create
+in chunks, one transaction per chunk. In upsert mode a known name updates that
+student's monthly_fee with bulk_update instead of being rejected. Rows that
+fail validation are handed to a rejects writer together with the reason.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import fragments, student_index
+from .models import Student
+
+CHUNK_SIZE = 1000
+
+REJECT_COLUMNS = ['line', 'name', 'monthly_fee', 'reason']
+
+NAME_MAX_LENGTH = Student._meta.get_field('name').max_length
+
+
+def read_csv(file):
+    """Yield (line number, row dict) for each data row of a CSV file with a header."""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_json(file):
+    """
+    Yield (line number, row dict) from a JSON array of objects, or from JSON
+    Lines (one object per line), which is read without loading the whole file.
+    """
+    first = file.read(1)
+    while first and first.isspace():
+        first = file.read(1)
+    if first == '[':
+        for number, row in enumerate(json.loads(first + file.read()), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(file, start=1):
+        line = (first + line) if number == 1 else line
+        if line.strip():
+            yield number, json.loads(line)
+
+
+def parse_fee(value):
+    """Return the fee as a Decimal, or raise ValueError."""
+    try:
+        fee = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Invalid monthly fee: {value}')
+    if not fee.is_finite() or fee < 0:
+        raise ValueError(f'Invalid monthly fee: {value}')
+    fee = fee.quantize(Decimal('0.01'))
+    if len(fee.as_tuple().digits) > 10:
+        raise ValueError(f'Monthly fee too large: {value}')
+    return fee
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+
+
+class StudentImporter:
+    """Validates rows and writes them in chunks. Call add() per row, then finish()."""
+
+    def __init__(self, chunk_size=CHUNK_SIZE, upsert=False, rejects=None):
+        self.chunk_size = chunk_size
+        self.upsert = upsert
+        self.rejects = rejects
+        self.result = ImportResult()
+        # name -> (id, monthly_fee) for every existing student
+        self.existing = {
+            name: (pk, fee)
+            for pk, name, fee in Student.objects.values_list('id', 'name', 'monthly_fee').iterator()
+        }
+        self.seen = set()
+        self.to_create = []
+        self.to_update = []
+
+    def reject(self, line, row, reason):
+        self.result.rejected += 1
+        if self.rejects is not None:
+            self.rejects.writerow([line, row.get('name', ''), row.get('monthly_fee', ''), reason])
+
+    def add(self, line, row):
+        if not isinstance(row, dict):
+            self.reject(line, {}, 'Row is not an object')
+            return
+        name = str(row.get('name') or '').strip()
+        if not name:
+            self.reject(line, row, 'Missing name')
+            return
+        if len(name) > NAME_MAX_LENGTH:
+            self.reject(line, row, f'Name longer than {NAME_MAX_LENGTH} characters')
+            return
+        if name in self.seen:
+            self.reject(line, row, 'Duplicate name in file')
+            return
+        try:
+            fee = parse_fee(row.get('monthly_fee'))
+        except ValueError as error:
+            self.reject(line, row, str(error))
+            return
+        self.seen.add(name)
+
+        if name not in self.existing:
+            self.to_create.append(Student(name=name, monthly_fee=fee))
+        elif not self.upsert:
+            self.reject(line, row, 'Student already exists')
+            return
+        elif self.existing[name][1] == fee:
+            self.result.unchanged += 1
+        else:
+            self.to_update.append(Student(
+                pk=self.existing[name][0], name=name, monthly_fee=fee, updated_at=timezone.now()
+            ))
+
+        if len(self.to_create) + len(self.to_update) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.to_create and not self.to_update:
+            return
+        with transaction.atomic():
+            Student.objects.bulk_create(self.to_create, batch_size=self.chunk_size)
+            Student.objects.bulk_update(self.to_update, ['monthly_fee', 'updated_at'], batch_size=self.chunk_size)
+        # bulk_create/bulk_update send no signals, so invalidate caches for every
+        # committed chunk: a later row can still abort the import with ValueError.
+        if self.to_create:
+            student_index.invalidate()
+        fragments.bump('Student')
+        self.result.created += len(self.to_create)
+        self.result.updated += len(self.to_update)
+        self.to_create = []
+        self.to_update = []
+
+    def finish(self):
+        self.flush()
+        return self.result
+
+
+def import_students(rows, chunk_size=CHUNK_SIZE, upsert=False, rejects=None):
+    """Import (line, row) pairs and return an ImportResult."""
+    importer = StudentImporter(chunk_size=chunk_size, upsert=upsert, rejects=rejects)
+    for line, row in rows:
+        importer.add(line, row)
+    return importer.finish()
@@ -0,0 +1,104 @@
+"""
+Process-local, casefolded index of student names for autocomplete.
+
+Names are kept in one sorted list, so a prefix query is a bisect plus a short
+forward scan instead of a LIKE scan over core_student on every keystroke. The
+index is rebuilt lazily after Student saves and deletes bump its version stamp.
+"""
+from bisect import bisect_left
+
+from django.db.models.functions import Lower
+
+from .models import Student
+from .versioned import VersionedSnapshot
+
+VERSION_CACHE_KEY = 'core:student_name_index:version'
+
+
+class StudentNameIndex:
+    def __init__(self, version, students):
+        self.version = version
+        # Sorted (casefolded name, name, id) tuples
+        self.entries = sorted((name.casefold(), name, pk) for pk, name in students)
+        self.names_by_id = {pk: name for pk, name in students}
+
+    @classmethod
+    def load(cls, version):
+        return cls(version, list(Student.objects.values_list('id', 'name')))
+
+    def prefix(self, query, limit=10):
+        """Return up to `limit` names starting with `query`, ignoring case."""
+        key = query.casefold()
+        position = bisect_left(self.entries, (key,))
+        names = []
+        for folded, name, _ in self.entries[position:position + limit]:
+            if not folded.startswith(key):
+                break
+            names.append(name)
+        return names
+
+
+def database_prefix(query, limit=10):
+    """
+    Fallback that asks the database instead of the in-memory index. It filters
+    on Lower('name') so it can use the functional index on core_student.
+    """
+    return list(
+        Student.objects.annotate(name_lower=Lower('name'))
+        .filter(name_lower__startswith=query.lower())
+        .order_by('name_lower', 'name')
+        .values_list('name', flat=True)[:limit]
+    )
+
+
+def picker_page(query, page=1, per_page=20):
+    """
+    Students whose names start with `query` (all students for an empty query),
+    ordered by name, as (students, has_next) for 1-based `page`. Fetches one
+    extra row instead of counting, and filters on Lower('name') like
+    database_prefix so the functional index applies.
+    """
+    students = (
+        Student.objects.annotate(name_lower=Lower('name'))
+        .only('id', 'name', 'monthly_fee', 'year', 'month', 'paid_amount', 'payment_status')
+        .order_by('name_lower', 'id')
+    )
+    if query:
+        students = students.filter(name_lower__startswith=query.lower())
+    offset = (page - 1) * per_page
+    rows = list(students[offset:offset + per_page + 1])
+    return rows[:per_page], len(rows) > per_page
+
+
+async def adatabase_prefix(query, limit=10):
+    """database_prefix() for async views."""
+    return [
+        name async for name in
+        Student.objects.annotate(name_lower=Lower('name'))
+        .filter(name_lower__startswith=query.lower())
+        .order_by('name_lower', 'name')
+        .values_list('name', flat=True)[:limit]
+    ]
+
+
+_snapshot = VersionedSnapshot(VERSION_CACHE_KEY, StudentNameIndex.load)
+
+
+def get_index():
+    return _snapshot.get()
+
+
+async def aget_index():
+    return await _snapshot.aget()
+
+
+def invalidate():
+    _snapshot.invalidate()
+
+
+def is_current(student):
+    """True when this process's index already holds the student under this name."""
+    index = _snapshot.loaded
+    if index is None or index.version != _snapshot.shared_version():
+        return False
+    return index.names_by_id.get(student.pk) == student.name
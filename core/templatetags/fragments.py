@@ -0,0 +1,44 @@
+from django import template
+
+from core import fragments
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.vary_on = vary_on
+
+    def render(self, context):
+        models = self.models.resolve(context).split()
+        vary_on = [variable.resolve(context) for variable in self.vary_on]
+        return fragments.get_or_render(
+            self.name.resolve(context), models, vary_on, lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache the enclosed template until one of the named models changes:
+
+        {% cachedfragment "students" "Student DraftPayment" user.is_staff %}
+            ...
+        {% endcachedfragment %}
+
+    Any arguments after the model names are also part of the cache key.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and model names.")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
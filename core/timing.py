@@ -0,0 +1,203 @@
+"""
+Per-request timing: query count, database time, template render time and the
+rest of the view, reported as a Server-Timing header and one structured log
+line per request, and recorded in core.metrics.
+
+Database time comes from an execute wrapper installed on every connection as
+it opens, which reports to the timings of the request running in the current
+context (so async views, whose queries run in worker threads, are counted
+too). Template time comes from the TimedDjangoTemplates backend; whatever is
+left of the request is "view" time. A request that goes over SLOW_REQUEST_QUERY_BUDGET queries or
+SLOW_REQUEST_TIME_BUDGET_MS milliseconds also gets its full SQL logged, each
+statement with the line in core/ that ran it.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+logger = logging.getLogger('core.timing')
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_current = contextvars.ContextVar('core_request_timings', default=None)
+
+
+def _origin():
+    """Return 'file:line in function' for the innermost frame in core/, outside this module."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(CORE_DIR) and filename != __file__:
+            return f'{os.path.relpath(filename, os.path.dirname(CORE_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class RequestTimings:
+    def __init__(self, record_sql=False):
+        self.record_sql = record_sql
+        self.started = time.perf_counter()
+        self.total_ms = 0
+        self.db_ms = 0
+        self.template_ms = 0
+        self.queries = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if self.record_sql:
+                self.statements.append((elapsed, sql, params, _origin()))
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    @property
+    def view_ms(self):
+        return max(0, self.total_ms - self.db_ms - self.template_ms)
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'view;dur={self.view_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+
+def _execute(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install(connection):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+class TimedTemplate:
+    """Wraps a backend template so its render time counts towards the request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render times reported to RequestTimingMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = self.start()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self):
+        query_budget = getattr(settings, 'SLOW_REQUEST_QUERY_BUDGET', None)
+        time_budget = getattr(settings, 'SLOW_REQUEST_TIME_BUDGET_MS', None)
+        return RequestTimings(record_sql=bool(query_budget or time_budget))
+
+    def finish(self, request, response, timings):
+        query_budget = getattr(settings, 'SLOW_REQUEST_QUERY_BUDGET', None)
+        time_budget = getattr(settings, 'SLOW_REQUEST_TIME_BUDGET_MS', None)
+        timings.finish()
+
+        response['Server-Timing'] = timings.server_timing()
+        match = request.resolver_match
+        metrics.observe_request(
+            match.view_name if match else None, response.status_code,
+            timings.total_ms / 1000, timings.queries, timings.db_ms / 1000,
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(timings.total_ms, 1),
+            'view_ms': round(timings.view_ms, 1),
+            'db_ms': round(timings.db_ms, 1),
+            'template_ms': round(timings.template_ms, 1),
+            'queries': timings.queries,
+        }))
+
+        over_queries = query_budget and timings.queries > query_budget
+        over_time = time_budget and timings.total_ms > time_budget
+        if over_queries or over_time:
+            lines = [
+                f'{request.method} {request.path} took {timings.total_ms:.1f} ms with {timings.queries} queries '
+                f'(budget {query_budget or "-"} queries, {time_budget or "-"} ms)'
+            ]
+            for elapsed, sql, params, origin in timings.statements:
+                lines.append(f'  [{elapsed:.1f} ms] {origin}: {sql} {params!r}')
+            logger.warning('\n'.join(lines))
+        return response
@@ -0,0 +1,81 @@
+"""
+"Who has not fully paid for period P" — shared by the month searches.
+
+A student counts as paid for a period when their snapshot or their ledger row
+for that period is Paid/Accepted. A full global holiday means nobody owes
+anything, and a full student discount takes that student off the list. The
+paid snapshots and paid ledger rows are looked up through their (year, month,
+status) indexes and excluded from the roster, which is walked in name order.
+"""
+from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+
+from .discount_calendar import get_calendar
+from .models import Student, StudentMonthlyStatus
+
+PAID_STATUSES = ['Paid', 'Accepted']
+
+PAGE_SIZE = 50
+
+MONTH_NAMES = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+
+
+def parse_month_query(text):
+    """Parse input like "December 2025" into (year, month), or return None."""
+    parts = text.lower().split()
+    if len(parts) < 2 or parts[0] not in MONTH_NAMES:
+        return None
+    try:
+        year = int(parts[1])
+    except ValueError:
+        return None
+    return year, MONTH_NAMES[parts[0]]
+
+
+class UnpaidStudents:
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        calendar = get_calendar()
+        holiday = calendar.holiday(year, month)
+        self.is_holiday = holiday is not None and holiday.discount_type == 'Full'
+        self.waived_student_ids = [
+            student_id
+            for (student_id, discount_year, discount_month), discount in calendar.student_discounts.items()
+            if (discount_year, discount_month) == (year, month) and discount.discount_type == 'Full'
+        ]
+
+    def queryset(self):
+        """Students still owing for the period, ordered by name."""
+        if self.is_holiday:
+            return Student.objects.none()
+        # Both paid sets are NOT IN subqueries so each reads its (year, month, status)
+        # index; a negated filter on the outer row cannot use one
+        paid_snapshots = Student.objects.filter(
+            year=self.year, month=self.month, payment_status__in=PAID_STATUSES
+        )
+        paid_ledger = StudentMonthlyStatus.objects.filter(
+            year=self.year, month=self.month, status__in=PAID_STATUSES
+        )
+        students = (
+            Student.objects
+            .exclude(pk__in=paid_snapshots.values('pk'))
+            .exclude(pk__in=paid_ledger.values('student_id'))
+        )
+        if self.waived_student_ids:
+            students = students.exclude(pk__in=self.waived_student_ids)
+        return students.order_by('name', 'id')
+
+    def count(self):
+        return self.queryset().count()
+
+    def page(self, number, per_page=PAGE_SIZE):
+        """One page of students, each annotated with its ledger status for the period."""
+        period_status = StudentMonthlyStatus.objects.filter(
+            student=OuterRef('pk'), year=self.year, month=self.month
+        ).values('status')[:1]
+        students = self.queryset().annotate(period_status=Subquery(period_status))
+        return Paginator(students, per_page).get_page(number)
@@ -0,0 +1,55 @@
+"""
+Process-local snapshots invalidated through a version stamp in the shared cache.
+
+Each worker process keeps its own in-memory copy of some rarely changing data
+and compares the copy's version with the stamp in the default cache on every
+read. Invalidating writes a new stamp, so every process rebuilds lazily on its
+next read.
+"""
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+class VersionedSnapshot:
+    def __init__(self, cache_key, loader):
+        self.cache_key = cache_key
+        # Called with the version stamp; returns an object with a `version` attribute
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._current = None
+
+    def shared_version(self):
+        return cache.get_or_set(self.cache_key, lambda: uuid.uuid4().hex, timeout=None)
+
+    @property
+    def loaded(self):
+        """This process's copy if it has one, without checking the shared stamp."""
+        return self._current
+
+    def get(self):
+        """Return the current snapshot, rebuilding it if another process invalidated it."""
+        version = self.shared_version()
+        current = self._current
+        if current is None or current.version != version:
+            with self._lock:
+                if self._current is None or self._current.version != version:
+                    self._current = self.loader(version)
+                current = self._current
+        return current
+
+    async def aget(self):
+        """get() for async views: only a stale copy is rebuilt, in a worker thread."""
+        version = await cache.aget_or_set(self.cache_key, lambda: uuid.uuid4().hex, timeout=None)
+        current = self._current
+        if current is not None and current.version == version:
+            return current
+        return await sync_to_async(self.get)()
+
+    def invalidate(self):
+        """Drop this process's copy and bump the shared version stamp."""
+        with self._lock:
+            self._current = None
+            cache.set(self.cache_key, uuid.uuid4().hex, timeout=None)
@@ -1,110 +1,74 @@
 from django.shortcuts import render, redirect
+from django.conf import settings
+import hmac
+import io
 import json
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.db import models
-from .models import DraftPayment, DraftExpense, Student, HolidayMonth, StudentDiscount
+from django.db import models, transaction
+from .models import (
+    DraftPayment, DraftExpense, Student, HolidayMonth, StudentDiscount, MonthlyFinanceSummary, PENDING_PAYMENT_STATUSES,
+)
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from datetime import datetime
 from decimal import Decimal
+from .fees import calculate_required_fees, iter_periods
+from .discount_calendar import get_calendar
+from . import approvals, exports, finance_summary, metrics, payment_import, payments, student_index
+from .conditional import conditional_on
+from .pagination import keyset_paginate
+from .student_import import read_csv, read_json
+from .unpaid import UnpaidStudents, parse_month_query
 
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.http import JsonResponse
 
-def calculate_required_fee(student, year, month):
+def calculate_required_fee(student, year, month, calendar=None):
     """
     Calculate the required monthly fee for a student, considering potential holiday discounts.
     Checks both global holidays and student-specific discounts.
     """
-    # First check for student-specific discount
-    try:
-        student_discount = StudentDiscount.objects.get(
-            student=student,
-            year=year,
-            month=month
-        )
-        if student_discount.discount_type == 'Full':
-            return Decimal('0')
-        elif student_discount.discount_type == 'Percentage':
-            discount = (student.monthly_fee * student_discount.discount_value) / 100
-            return max(Decimal('0'), student.monthly_fee - discount)
-        elif student_discount.discount_type == 'Amount':
-            return max(Decimal('0'), student.monthly_fee - student_discount.discount_value)
-    except StudentDiscount.DoesNotExist:
-        pass
-    
-    # If no student-specific discount, check for global holiday
-    try:
-        holiday = HolidayMonth.objects.get(year=year, month=month)
-        if holiday.discount_type == 'Full':
-            return Decimal('0')
-        elif holiday.discount_type == 'Percentage':
-            discount = (student.monthly_fee * holiday.discount_value) / 100
-            return max(Decimal('0'), student.monthly_fee - discount)
-        elif holiday.discount_type == 'Amount':
-            return max(Decimal('0'), student.monthly_fee - holiday.discount_value)
-    except HolidayMonth.DoesNotExist:
-        pass
-    
-    return student.monthly_fee
+    year, month = int(year), int(month)
+    fees = calculate_required_fees([student], (year, month), (year, month), calendar=calendar)
+    return fees[(student.pk, year, month)]
 
-def get_next_payment_month_year(student):
+def get_next_payment_month_year(student, lookahead=24, calendar=None):
     """
     Get the next payment month and year for a student based on their last payment,
     skipping FULL holiday months (both global and student-specific).
+    With a preloaded discount calendar this runs no queries.
     """
-    # Helper to check if a month is a *full* holiday or full discount for this student
-    def is_full_discount(m, y):
-        # First check for student-specific full discount
-        try:
-            student_discount = StudentDiscount.objects.get(student=student, month=m, year=y)
-            return student_discount.discount_type == 'Full'
-        except StudentDiscount.DoesNotExist:
-            pass
-        
-        # Then check for global full holiday
-        try:
-            h = HolidayMonth.objects.get(month=m, year=y)
-            return h.discount_type == 'Full'
-        except HolidayMonth.DoesNotExist:
-            return False
-
-    next_month = 0
-    next_year = 0
-    
+    calendar = calendar or get_calendar()
     # Check if student has a payment status
     if student.payment_status in ['Half Paid']:
         # Return remaining amount for the half-paid month
-        required = calculate_required_fee(student, student.year, student.month)
+        required = calculate_required_fee(student, student.year, student.month, calendar)
         remaining = max(Decimal('0'), required - student.paid_amount)
         return student.month, student.year, remaining
     elif student.payment_status in ['Paid', 'Accepted']:
         # Start checking from next month
-        next_month = student.month + 1
-        next_year = student.year
+        start = DraftPayment.normalize_month_year(student.year, student.month + 1)
     else:
         # No payment history - start from current month
         today = datetime.now()
-        next_month = today.month
-        next_year = today.year
-
-    # Normalize and skip holidays (loop until we find a non-holiday or partial holiday month)
-    # Limit loop to prevent infinite loop
-    for _ in range(24): # Look ahead 2 years max
-        if next_month > 12:
-            next_month = 1
-            next_year += 1
-            
-        # Check if this month has a full discount for this student
-        if not is_full_discount(next_month, next_year):
+        start = (today.year, today.month)
+
+    # Load every full-discount month in the lookahead window (2 years max) up front,
+    # then skip over them in memory
+    end = DraftPayment.normalize_month_year(start[0], start[1] + lookahead - 1)
+    window = list(iter_periods(start, end))
+    full_periods = calendar.full_discount_periods(student.pk, window)
+
+    for next_year, next_month in window:
+        if (next_year, next_month) not in full_periods:
             # Calculate the required fee for this month
-            fee = calculate_required_fee(student, next_year, next_month)
+            fee = calculate_required_fee(student, next_year, next_month, calendar)
             return next_month, next_year, fee
-            
-        # Skip full discount months
-        next_month += 1
-        
+
+    next_year, next_month = DraftPayment.normalize_month_year(end[0], end[1] + 1)
     return next_month, next_year, 0
 
 @login_required(login_url='login')
@@ -116,114 +80,107 @@ def add_payment(request):
     error_message = None
     if request.method == 'POST':
         student_id = request.POST.get('student_id')
-        amount = request.POST.get('amount')
-        monthly_fee = request.POST.get('monthly_fee')
-        description = request.POST.get('description')
-        month = request.POST.get('month', datetime.now().month)
-        year = request.POST.get('year', datetime.now().year)
-        
-        student = None
         if student_id:
             try:
-                student = Student.objects.get(pk=student_id)
+                payments.apply_payment(
+                    student_id,
+                    request.POST.get('amount'),
+                    month=request.POST.get('month', datetime.now().month),
+                    year=request.POST.get('year', datetime.now().year),
+                    user=request.user,
+                    monthly_fee=request.POST.get('monthly_fee'),
+                    description=request.POST.get('description'),
+                )
+            except payments.PaymentRejected as error:
+                error_message = str(error)
             except (Student.DoesNotExist, ValueError):
                 pass
+            else:
+                if request.headers.get('HX-Request'):
+                    response = render(request, 'add_payment.html')
+                    response['HX-Trigger'] = json.dumps({
+                        'showDraftToast': {},
+                        'resetPaymentForm': {}
+                    })
+                    return response
+                return redirect('index')
+    
+    # Students are looked up through student_picker, so the page does not grow with enrollment
+    return render(request, 'add_payment.html', {'error_message': error_message})
 
-        # Use provided monthly_fee or fall back to student's monthly fee
-        payment_monthly_fee = monthly_fee if monthly_fee else (student.monthly_fee if student else None)
+PICKER_PAGE_SIZE = 20
 
-        # Validation: block next-month payment if current month is Half Paid or Unpaid
-        if student:
-            try:
-                target_month = int(month)
-                target_year = int(year)
-                # Normalize month/year if needed
-                if target_month < 1:
-                    target_month += 12
-                    target_year -= 1
-                elif target_month > 12:
-                    target_month -= 12
-                    target_year += 1
-
-                # Check if there's an existing payment status for the target month
-                if student.year == target_year and student.month == target_month and student.payment_status in ['Paid', 'Accepted']:
-                    error_message = f"Cannot create new payment for {target_month}/{target_year} - payment is already {student.payment_status}."
-                else:
-                    # Determine payment status and handle half payments
-                    payment_amount = Decimal(amount)
-                    monthly_fee_amount = Decimal(payment_monthly_fee) if payment_monthly_fee else Decimal('0')
-                    
-                    # Check for holiday discount override
-                    holiday = HolidayMonth.objects.filter(month=target_month, year=target_year).first()
-                    if holiday and holiday.discount_type != 'Full':
-                        # Recalculate expected fee based on holiday
-                        base_fee = student.monthly_fee if student else monthly_fee_amount
-                        if holiday.discount_type == 'Percentage':
-                            monthly_fee_amount = base_fee - (base_fee * holiday.discount_value / 100)
-                        elif holiday.discount_type == 'Amount':
-                            monthly_fee_amount = base_fee - holiday.discount_value
-                        monthly_fee_amount = max(Decimal('0'), monthly_fee_amount)
-                    
-                    # Calculate required fee based on holiday discounts
-                    required_fee = calculate_required_fee(student, target_year, target_month)
-                    
-                    # Calculate total paid after this payment
-                    current_paid = student.paid_amount if student.year == target_year and student.month == target_month else Decimal('0')
-                    total_paid = current_paid + payment_amount
-                    
-                    # Determine status based on payment amount against REQUIRED fee, not just base monthly fee
-                    # However, if monthly_fee was overridden in input, use that, but usually for holidays we want the discount logic.
-                    # Logic: If monthly_fee matches student.monthly_fee, apply discount. If custom, trust user?
-                    # Safer: Always apply discount to the base fee expectation.
-                    
-                    # If total paid meets the required fee (which might be reduced)
-                    if total_paid >= required_fee:
-                        status = 'Paid'
-                        final_amount = total_paid # Record what was actually paid
-                    elif total_paid > 0:
-                        status = 'Half Paid'
-                        final_amount = total_paid
-                    else:
-                        status = 'Unpaid'
-                        final_amount = Decimal('0')
-                    
-                    # Update student's monthly status directly
-                    student.year = target_year
-                    student.month = target_month
-                    student.paid_amount = final_amount
-                    student.payment_status = status
-                    student.save()
-                    
-                    # Create DraftPayment record
-                    DraftPayment.objects.create(
-                        user=request.user,
-                        student=student,
-                        amount=payment_amount,
-                        monthly_fee=payment_monthly_fee,
-                        description=description,
-                        month=month,
-                        year=year,
-                        status=status  # Set status based on payment logic
-                    )
-
-                    if request.headers.get('HX-Request'):
-                        response = render(request, 'add_payment.html')
-                        response['HX-Trigger'] = json.dumps({
-                            'showDraftToast': {},
-                            'resetPaymentForm': {}
-                        })
-                        return response
-                    return redirect('index')
-            except (Student.DoesNotExist, ValueError):
-                pass
-    
-    students = Student.objects.all().order_by('name')
-    return render(request, 'add_payment.html', {'students': students, 'error_message': error_message})
+@login_required(login_url='login')
+def student_picker(request):
+    """
+    One page of students matching `q`, each with their next due period:
+    JSON for the add-payment picker, or suggestion items for HTMX requests.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    students, has_next = student_index.picker_page(query, page, PICKER_PAGE_SIZE)
+    calendar = get_calendar()
+    for student in students:
+        student.next_month, student.next_year, student.next_amount = get_next_payment_month_year(
+            student, calendar=calendar
+        )
+    next_page = page + 1 if has_next else None
 
-from django.views.decorators.cache import never_cache
+    if request.headers.get('HX-Request'):
+        return render(request, 'partials/student_picker_items.html', {
+            'students': students,
+            'next_page': next_page,
+            'query': query,
+        })
+    return JsonResponse({
+        'students': [
+            {
+                'id': student.pk,
+                'name': student.name,
+                'monthly_fee': str(student.monthly_fee),
+                'next_due': {
+                    'year': student.next_year,
+                    'month': student.next_month,
+                    'amount': str(student.next_amount),
+                },
+            }
+            for student in students
+        ],
+        'next_page': next_page,
+    })
+
+def _render_month_search(request, search_query):
+    """Render the students who have not fully paid for the month in `search_query`."""
+    period = parse_month_query(search_query)
+    if period is None:
+        return render(request, 'partials/month_search_results.html', {
+            'error': True,
+            'search_query': search_query,
+        })
+
+    year, month = period
+    unpaid = UnpaidStudents(year, month)
+    page = unpaid.page(request.GET.get('page', 1))
+    context = {
+        'page': page,
+        'unpaid_students': page.object_list,
+        'unpaid_count': page.paginator.count,
+        'month_name': search_query.split()[0].capitalize(),
+        'year': year,
+        'month': month,
+        'is_holiday': unpaid.is_holiday,
+        'search_query': search_query,
+    }
+    if request.headers.get('HX-Request') and 'page' in request.GET:
+        return render(request, 'partials/unpaid_student_items.html', context)
+    return render(request, 'partials/month_search_results.html', context)
 
-@never_cache
 @login_required(login_url='login')
+@conditional_on('Student', 'StudentMonthlyStatus', 'DraftPayment', 'HolidayMonth', 'StudentDiscount')
 def get_student_details(request):
     search_type = request.GET.get('search_type', 'student')
     # Support both old and new parameter names for compatibility
@@ -233,42 +190,8 @@ def get_student_details(request):
     ).strip()
     
     if search_type == 'month':
-        # Handle month search - return unpaid students for that month
-        try:
-            # Parse month input like "December 2025"
-            month_names = {
-                'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-                'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-            }
-            
-            parts = search_query.lower().split()
-            if len(parts) >= 2:
-                month_name = parts[0]
-                year = int(parts[1])
-                
-                if month_name in month_names:
-                    month = month_names[month_name]
-                    
-                    # Get unpaid students for this month
-                    unpaid_students = Student.objects.filter(
-                        models.Q(year__isnull=True) | models.Q(month__isnull=True) |
-                        models.Q(year=year, month=month, payment_status='Unpaid')
-                    ).order_by('name')
-                    
-                    return render(request, 'partials/month_search_results.html', {
-                        'unpaid_students': unpaid_students,
-                        'month_name': month_name.capitalize(),
-                        'year': year,
-                        'month': month
-                    })
-        except (ValueError, IndexError):
-            pass
-        
-        return render(request, 'partials/month_search_results.html', {
-            'error': True,
-            'search_query': search_query
-        })
-    
+        return _render_month_search(request, search_query)
+
     else:
         # Handle student search (existing functionality)
         try:
@@ -287,6 +210,7 @@ def get_student_details(request):
             return render(request, 'partials/student_details.html', {'student': None})
 
 @login_required(login_url='login')
+@conditional_on('Student', 'HolidayMonth', 'StudentDiscount')
 def get_student_monthly_fee(request):
     student_id = request.GET.get('student_id', '')
     month = request.GET.get('month', '')
@@ -313,17 +237,31 @@ def get_student_monthly_fee(request):
             return HttpResponse('0')
         return HttpResponse('0')
 
+def _parse_period(value):
+    """(year, month) from a "YYYY-MM" month input, or (None, None) if blank or invalid"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        return None, None
+    if not 1 <= month <= 12:
+        return None, None
+    return year, month
+
 @login_required(login_url='login')
 def add_expense(request):
     if request.method == 'POST':
         name = request.POST.get('name')
         amount = request.POST.get('amount')
         description = request.POST.get('description')
+        # Optional "YYYY-MM" period to book the expense to; defaults to this month
+        year, month = _parse_period(request.POST.get('period', ''))
         DraftExpense.objects.create(
             user=request.user,
             name=name,
             amount=amount,
-            description=description
+            description=description,
+            year=year,
+            month=month
         )
         if request.headers.get('HX-Request'):
             response = render(request, 'add_expense.html')
@@ -333,50 +271,52 @@ def add_expense(request):
     return render(request, 'add_expense.html')
 
 @login_required(login_url='login')
+@conditional_on('DraftPayment', 'Student')
 def view_payments(request):
     # Show only payments that need admin action (Draft, Half Paid, Paid but not yet Accepted)
     payments = DraftPayment.objects.filter(
-        status__in=['Draft', 'Half Paid', 'Paid']
-    ).exclude(student__isnull=True).order_by('-created_date')
-    return render(request, 'view_payments.html', {
-        'payments': payments
-    })
+        status__in=PENDING_PAYMENT_STATUSES
+    ).exclude(student__isnull=True).select_related('student', 'user')
+    page = keyset_paginate(payments, 'created_date', request.GET.get('cursor'))
+    context = {'payments': page.items, 'next_cursor': page.next_cursor}
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, 'partials/pending_payment_rows.html', context)
+    return render(request, 'view_payments.html', context)
 
 @login_required(login_url='login')
+@conditional_on('DraftExpense')
 def view_expenses(request):
-    expenses = DraftExpense.objects.filter(status='Draft').order_by('-created_time')
-    return render(request, 'view_expenses.html', {
-        'expenses': expenses
-    })
+    expenses = DraftExpense.objects.filter(status='Draft').select_related('user')
+    page = keyset_paginate(expenses, 'created_time', request.GET.get('cursor'))
+    context = {'expenses': page.items, 'next_cursor': page.next_cursor}
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, 'partials/pending_expense_rows.html', context)
+    return render(request, 'view_expenses.html', context)
 
 # Admin Approval Views
 @login_required(login_url='login')
 def accept_payment(request, pk):
     if request.user.is_staff:
-        payment = DraftPayment.objects.get(pk=pk)
-        
-        # Check if admin adjusted the amount
-        if request.method == 'POST':
-            adjusted_amount = request.POST.get('adjusted_amount')
-            if adjusted_amount:
-                payment.amount = adjusted_amount
-        
-        # Set payment status to Accepted for admin tracking
-        payment.status = 'Accepted'
-        payment.oath_user = request.user.username
-        payment.save()
-        
-        # Process payment to update StudentMonthlyStatus with correct status
-        if payment.student:
-            # Temporarily set status to allow process_payment to determine correct status
-            original_status = payment.status
-            payment.status = 'Draft'  # Reset to draft so process_payment can set correct status
-            payment.process_payment()
-            # Restore Accepted status for the payment record
-            payment.status = original_status
+        with transaction.atomic():
+            # Locked so two staff accepting the same payment apply it once after the other
+            payment = DraftPayment.objects.select_for_update().get(pk=pk)
+            payment_before = finance_summary.payment_contribution(payment)
+
+            # Check if admin adjusted the amount
+            if request.method == 'POST':
+                adjusted_amount = request.POST.get('adjusted_amount')
+                if adjusted_amount:
+                    payment.amount = Decimal(adjusted_amount)
+
+            # Set payment status to Accepted for admin tracking; saving an
+            # Accepted payment applies it to the student's snapshot
+            payment.status = 'Accepted'
             payment.oath_user = request.user.username
-            payment.save()
-        
+            payment.save(update_fields=['amount', 'status', 'oath_user', 'year', 'month', 'updated_at'])
+
+            finance_summary.record_payment_change(payment_before, finance_summary.payment_contribution(payment))
+            metrics.inc_on_commit('payments_accepted_total')
+
     if request.headers.get('HX-Request'):
         return render(request, 'partials/payment_row.html', {'payment': payment})
     return redirect('view_payments')
@@ -384,10 +324,14 @@ def accept_payment(request, pk):
 @login_required(login_url='login')
 def decline_payment(request, pk):
     if request.user.is_staff:
-        payment = DraftPayment.objects.get(pk=pk)
-        payment.status = 'Declined'
-        payment.oath_user = request.user.username
-        payment.save()
+        with transaction.atomic():
+            payment = DraftPayment.objects.get(pk=pk)
+            payment_before = finance_summary.payment_contribution(payment)
+            payment.status = 'Declined'
+            payment.oath_user = request.user.username
+            payment.save()
+            finance_summary.record_payment_change(payment_before, None)
+            metrics.inc_on_commit('payments_declined_total')
     if request.headers.get('HX-Request'):
         return render(request, 'partials/payment_row.html', {'payment': payment})
     return redirect('view_payments')
@@ -395,17 +339,21 @@ def decline_payment(request, pk):
 @login_required(login_url='login')
 def approve_expense(request, pk):
     if request.user.is_staff:
-        expense = DraftExpense.objects.get(pk=pk)
-        
-        # Check if admin adjusted the amount
-        if request.method == 'POST':
-            adjusted_amount = request.POST.get('adjusted_amount')
-            if adjusted_amount:
-                expense.amount = adjusted_amount
-        
-        expense.status = 'Accepted'
-        expense.oath_user = request.user.username
-        expense.save()
+        with transaction.atomic():
+            expense = DraftExpense.objects.get(pk=pk)
+            expense_before = finance_summary.expense_contribution(expense)
+
+            # Check if admin adjusted the amount
+            if request.method == 'POST':
+                adjusted_amount = request.POST.get('adjusted_amount')
+                if adjusted_amount:
+                    expense.amount = adjusted_amount
+
+            expense.status = 'Accepted'
+            expense.oath_user = request.user.username
+            expense.save()
+            finance_summary.record_expense_change(expense_before, finance_summary.expense_contribution(expense))
+            metrics.inc_on_commit('expenses_approved_total')
     if request.headers.get('HX-Request'):
         return render(request, 'partials/expense_row.html', {'expense': expense})
     return redirect('view_expenses')
@@ -413,39 +361,189 @@ def approve_expense(request, pk):
 @login_required(login_url='login')
 def decline_expense(request, pk):
     if request.user.is_staff:
-        expense = DraftExpense.objects.get(pk=pk)
-        expense.status = 'Declined'
-        expense.oath_user = request.user.username
-        expense.save()
+        with transaction.atomic():
+            expense = DraftExpense.objects.get(pk=pk)
+            expense_before = finance_summary.expense_contribution(expense)
+            expense.status = 'Declined'
+            expense.oath_user = request.user.username
+            expense.save()
+            finance_summary.record_expense_change(expense_before, None)
+            metrics.inc_on_commit('expenses_declined_total')
     if request.headers.get('HX-Request'):
         return render(request, 'partials/expense_row.html', {'expense': expense})
     return redirect('view_expenses')
 
+def _bulk_response(request, template, context, message, fallback):
+    if request.headers.get('HX-Request'):
+        response = render(request, template, context)
+        response['HX-Trigger'] = json.dumps({
+            "showToast": {
+                "message": message,
+                "type": "success"
+            }
+        })
+        return response
+    return redirect(fallback)
+
+@login_required(login_url='login')
+@require_POST
+def bulk_accept_payments(request):
+    if not request.user.is_staff:
+        return redirect('view_payments')
+    ids = approvals.parse_ids(request.POST.getlist('ids'))
+    try:
+        adjusted_amounts = approvals.parse_adjusted_amounts(request.POST, ids)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    payments = approvals.accept_payments(ids, request.user.username, adjusted_amounts)
+    return _bulk_response(request, 'partials/bulk_payment_rows.html', {'payments': payments},
+                          f"{len(payments)} payments accepted", 'view_payments')
+
+@login_required(login_url='login')
+@require_POST
+def bulk_decline_payments(request):
+    if not request.user.is_staff:
+        return redirect('view_payments')
+    ids = approvals.parse_ids(request.POST.getlist('ids'))
+    payments = approvals.decline_payments(ids, request.user.username)
+    return _bulk_response(request, 'partials/bulk_payment_rows.html', {'payments': payments},
+                          f"{len(payments)} payments declined", 'view_payments')
+
+@login_required(login_url='login')
+@require_POST
+def bulk_approve_expenses(request):
+    if not request.user.is_staff:
+        return redirect('view_expenses')
+    ids = approvals.parse_ids(request.POST.getlist('ids'))
+    try:
+        adjusted_amounts = approvals.parse_adjusted_amounts(request.POST, ids)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    expenses = approvals.approve_expenses(ids, request.user.username, adjusted_amounts)
+    return _bulk_response(request, 'partials/bulk_expense_rows.html', {'expenses': expenses},
+                          f"{len(expenses)} expenses approved", 'view_expenses')
+
+@login_required(login_url='login')
+@require_POST
+def bulk_decline_expenses(request):
+    if not request.user.is_staff:
+        return redirect('view_expenses')
+    ids = approvals.parse_ids(request.POST.getlist('ids'))
+    expenses = approvals.decline_expenses(ids, request.user.username)
+    return _bulk_response(request, 'partials/bulk_expense_rows.html', {'expenses': expenses},
+                          f"{len(expenses)} expenses declined", 'view_expenses')
+
 @login_required(login_url='login')
+@conditional_on('DraftPayment', 'DraftExpense', 'Student')
 def view_confirmed(request):
-    payments = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted']).exclude(student__isnull=True).order_by('-created_date')
-    expenses = DraftExpense.objects.filter(status='Accepted').order_by('-created_time')
+    payments = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted']).exclude(student__isnull=True).select_related('student', 'user')
+    expenses = DraftExpense.objects.filter(status='Accepted').select_related('user')
+    section = request.GET.get('section')
+    cursor = request.GET.get('cursor')
+
+    # "Load more" on one of the two tables only needs that table's next page
+    if request.headers.get('HX-Request') and cursor:
+        if section == 'payments':
+            page = keyset_paginate(payments, 'created_date', cursor)
+            return render(request, 'partials/confirmed_payment_rows.html', {
+                'payments': page.items,
+                'next_cursor': page.next_cursor,
+                'section': section,
+                'with_period': True
+            })
+        if section == 'expenses':
+            page = keyset_paginate(expenses, 'created_time', cursor)
+            return render(request, 'partials/confirmed_expense_rows.html', {
+                'expenses': page.items,
+                'next_cursor': page.next_cursor,
+                'section': section
+            })
+
+    payments_page = keyset_paginate(payments, 'created_date')
+    expenses_page = keyset_paginate(expenses, 'created_time')
     return render(request, 'confirmed_transactions.html', {
-        'payments': payments,
-        'expenses': expenses
+        'payments': payments_page.items,
+        'payments_next_cursor': payments_page.next_cursor,
+        'expenses': expenses_page.items,
+        'expenses_next_cursor': expenses_page.next_cursor
     })
 
 @login_required(login_url='login')
+@conditional_on('DraftPayment', 'Student')
 def view_confirmed_payments(request):
-    payments = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted']).exclude(student__isnull=True).order_by('-created_date')
-    return render(request, 'confirmed_payments.html', {
-        'payments': payments
-    })
+    payments = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid', 'Accepted']).exclude(student__isnull=True).select_related('student', 'user')
+    page = keyset_paginate(payments, 'created_date', request.GET.get('cursor'))
+    context = {'payments': page.items, 'next_cursor': page.next_cursor}
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, 'partials/confirmed_payment_rows.html', context)
+    return render(request, 'confirmed_payments.html', context)
 
 @login_required(login_url='login')
+@conditional_on('DraftExpense')
 def view_confirmed_expenses(request):
-    expenses = DraftExpense.objects.filter(status='Accepted').order_by('-created_time')
-    return render(request, 'confirmed_expenses.html', {
-        'expenses': expenses
-    })
+    expenses = DraftExpense.objects.filter(status='Accepted').select_related('user')
+    page = keyset_paginate(expenses, 'created_time', request.GET.get('cursor'))
+    context = {'expenses': page.items, 'next_cursor': page.next_cursor}
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, 'partials/confirmed_expense_rows.html', context)
+    return render(request, 'confirmed_expenses.html', context)
 
-from django.db.models import Sum, functions
-from datetime import datetime
+@login_required(login_url='login')
+def export_payments(request):
+    """Stream confirmed payments as CSV, filtered by year/month/student/status."""
+    rows = exports.payment_rows(
+        year=request.GET.get('year'),
+        month=request.GET.get('month'),
+        student=request.GET.get('student', '').strip(),
+        status=request.GET.get('status', '').strip(),
+    )
+    response = StreamingHttpResponse(exports.iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="confirmed_payments.csv"'
+    return response
+
+@login_required(login_url='login')
+def export_expenses(request):
+    """Stream accepted expenses as CSV, filtered by year/month/status."""
+    rows = exports.expense_rows(
+        year=request.GET.get('year'),
+        month=request.GET.get('month'),
+        status=request.GET.get('status', '').strip(),
+    )
+    response = StreamingHttpResponse(exports.iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="confirmed_expenses.csv"'
+    return response
+
+@login_required(login_url='login')
+def import_payments(request):
+    """Upload a bank/cashier statement and ingest it, or report what it would do."""
+    if not request.user.is_staff:
+        return redirect('index')
+
+    context = {}
+    if request.method == 'POST':
+        upload = request.FILES.get('statement')
+        if upload is None:
+            context['error_message'] = 'Choose a statement file to upload.'
+        else:
+            source = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            reader = read_json if upload.name.lower().endswith(('.json', '.jsonl')) else read_csv
+            try:
+                context['result'] = payment_import.ingest_payments(
+                    reader(source), user=request.user, dry_run=bool(request.POST.get('dry_run'))
+                )
+            except (ValueError, UnicodeDecodeError) as error:
+                context['error_message'] = f'Cannot read {upload.name}: {error}'
+
+    response = render(request, 'import_payments.html', context)
+    result = context.get('result')
+    if request.headers.get('HX-Request') and result and not result.dry_run:
+        response['HX-Trigger'] = json.dumps({
+            'showToast': {
+                'message': f'Imported {len(result.accepted)} payments',
+                'type': 'success'
+            }
+        })
+    return response
 
 @login_required(login_url='login')
 def analyze_view(request):
@@ -457,80 +555,60 @@ def analyze_view(request):
         selected_year = datetime.now().year
     
     # Get all available years with data
-    available_years = set()
-    payment_years = DraftPayment.objects.filter(status__in=['Paid', 'Half Paid']).values_list('year', flat=True).distinct()
-    expense_years = DraftExpense.objects.filter(status='Accepted').dates('created_time', 'year')
-    available_years.update(payment_years)
-    available_years.update(expense_years.year for expense_years in expense_years)
+    available_years = set(
+        MonthlyFinanceSummary.objects.exclude(collected=0, expenses=0)
+        .values_list('year', flat=True).distinct()
+    )
     
     # Add current year if not present
     available_years.add(datetime.now().year)
     
     available_years = sorted(available_years, reverse=True)
     
-    # Prepare data for selected year
-    # Get confirmed payments for this year
-    confirmed_payments = DraftPayment.objects.filter(
-        status__in=['Paid', 'Half Paid', 'Accepted'],
-        year=selected_year
-    ).exclude(student__isnull=True).order_by('month', 'created_date')
-    
-    # Get confirmed expenses for this year
-    confirmed_expenses = DraftExpense.objects.filter(
-        status='Accepted',
-        created_time__year=selected_year
-    ).order_by('created_time')
-    
+    # Read the incrementally maintained monthly rollup (12 rows at most)
+    summaries = {
+        summary.month: summary
+        for summary in MonthlyFinanceSummary.objects.filter(year=selected_year)
+    }
+
     # Calculate monthly totals
     monthly_totals = {}
     for month in range(1, 13):
+        summary = summaries.get(month) or MonthlyFinanceSummary(year=selected_year, month=month)
         monthly_totals[month] = {
             'month_name': datetime(selected_year, month, 1).strftime('%B'),
-            'total_payments': 0,
-            'total_expenses': 0,
-            'net': 0
+            'total_payments': Decimal(summary.collected),
+            'total_expenses': Decimal(summary.expenses),
+            'net': Decimal(summary.collected) - Decimal(summary.expenses)
         }
-    
-    # Sum payments by month
-    for payment in confirmed_payments:
-        monthly_totals[payment.month]['total_payments'] += float(payment.amount)
-    
-    # Sum expenses by month
-    for expense in confirmed_expenses:
-        month = expense.created_time.month
-        monthly_totals[month]['total_expenses'] += float(expense.amount)
-    
-    # Calculate net for each month
-    for month_data in monthly_totals.values():
-        month_data['net'] = month_data['total_payments'] - month_data['total_expenses']
-    
+
     # Calculate yearly totals
-    yearly_total_payments = sum(data['total_payments'] for data in monthly_totals.values())
-    yearly_total_expenses = sum(data['total_expenses'] for data in monthly_totals.values())
+    yearly_total_payments = sum((data['total_payments'] for data in monthly_totals.values()), Decimal('0'))
+    yearly_total_expenses = sum((data['total_expenses'] for data in monthly_totals.values()), Decimal('0'))
     yearly_net = yearly_total_payments - yearly_total_expenses
-    
-    # Get annual report using simple queries
+
+    # Get annual report: student counts come from one aggregate, the rest from the rollup
+    student_counts = Student.objects.aggregate(
+        total=models.Count('id'),
+        no_history=models.Count('id', filter=models.Q(year__isnull=True) | models.Q(month__isnull=True)),
+    )
+    # What the students whose latest period falls in each month have paid towards it
+    snapshot_collected = dict(
+        Student.objects.filter(year=selected_year, payment_status__in=['Paid', 'Half Paid'])
+        .values('month').annotate(collected=models.Sum('paid_amount')).order_by()
+        .values_list('month', 'collected')
+    )
+
     annual_report_data = []
     for month in range(1, 13):
-        total_students = Student.objects.count()
-        paid_students = Student.objects.filter(year=selected_year, month=month, payment_status='Paid').count()
-        half_paid_students = Student.objects.filter(year=selected_year, month=month, payment_status='Half Paid').count()
-        unpaid_students = Student.objects.filter(
-            models.Q(year__isnull=True) | models.Q(month__isnull=True) | 
-            models.Q(year=selected_year, month=month, payment_status='Unpaid')
-        ).count()
-        
-        total_collected = Student.objects.filter(
-            year=selected_year, month=month, payment_status__in=['Paid', 'Half Paid']
-        ).aggregate(total=models.Sum('paid_amount'))['total'] or 0
-        
+        summary = summaries.get(month) or MonthlyFinanceSummary(year=selected_year, month=month)
         annual_report_data.append({
             'month': month,
-            'total_students': total_students,
-            'paid_students': paid_students,
-            'half_paid_students': half_paid_students,
-            'unpaid_students': unpaid_students,
-            'total_collected': total_collected
+            'total_students': student_counts['total'],
+            'paid_students': summary.paid_students,
+            'half_paid_students': summary.half_paid_students,
+            'unpaid_students': student_counts['no_history'] + summary.unpaid_students,
+            'total_collected': snapshot_collected.get(month) or Decimal('0')
         })
     
     return render(request, 'analyze.html', {
@@ -538,8 +616,6 @@ def analyze_view(request):
         'yearly_total_payments': yearly_total_payments,
         'yearly_total_expenses': yearly_total_expenses,
         'yearly_net': yearly_net,
-        'confirmed_payments': confirmed_payments,
-        'confirmed_expenses': confirmed_expenses,
         'annual_report': annual_report_data,
         'selected_year': selected_year,
         'available_years': available_years
@@ -571,13 +647,50 @@ def login_view(request):
     return render(request, 'login.html')
 
 @login_required(login_url='login')
+@conditional_on('Student', 'DraftPayment')
 def view_students(request):
-    students = Student.objects.all().order_by('name')
-    month_names = ['January', 'February', 'March', 'April', 'May', 'June', 
-                   'July', 'August', 'September', 'October', 'November', 'December']
-    for s in students:
-        s.last_paid_month = DraftPayment.get_last_paid_month(s)
-    return render(request, 'students.html', {'students': students, 'month_names': month_names})
+    return render(request, 'students.html', _student_list_context())
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+def _with_last_paid_month(student):
+    student.last_paid_month = DraftPayment.get_last_paid_month(student)
+    if student.last_paid_month:
+        student.last_paid_month['month_name'] = MONTH_NAMES[student.last_paid_month['month'] - 1]
+    return student
+
+def _student_list_context():
+    """
+    Context for students.html. The rows and the count are built lazily, so
+    cached student_rows and student_count fragments cost no queries.
+    """
+    def build_rows():
+        return [_with_last_paid_month(s) for s in Student.objects.all().order_by('name')]
+
+    return {
+        'students': SimpleLazyObject(build_rows),
+        'student_count': Student.objects.count,
+    }
+
+def _student_row_response(request, student, message, template='partials/student_row.html'):
+    """
+    HTMX answer to a student add/update: the one affected row, the student
+    count swapped out of band, and a toast. Its size does not depend on how
+    many students there are.
+    """
+    response = render(request, template, {
+        'student': _with_last_paid_month(student),
+        'student_count': Student.objects.count(),
+        'oob': True,
+    })
+    response['HX-Trigger'] = json.dumps({
+        "showToast": {
+            "message": message,
+            "type": "success"
+        }
+    })
+    return response
 
 @login_required(login_url='login')
 def add_student(request):
@@ -587,19 +700,13 @@ def add_student(request):
     if request.method == 'POST':
         name = request.POST.get('name', '')
         fixed_fee = request.POST.get('monthly_fee')
-        Student.objects.create(
+        student = Student.objects.create(
             name=name,
             monthly_fee=fixed_fee
         )
         if request.headers.get('HX-Request'):
-            response = render(request, 'students.html', {'students': Student.objects.all().order_by('name')})
-            response['HX-Trigger'] = json.dumps({
-                "showToast": {
-                    "message": "Student added",
-                    "type": "success"
-                }
-            })
-            return response
+            student.refresh_from_db(fields=['monthly_fee'])
+            return _student_row_response(request, student, "Student added", 'partials/student_added.html')
         return redirect('view_students')
     
     return render(request, 'student_form.html', {'title': 'Add Student', 'is_update': False})
@@ -615,25 +722,33 @@ def update_student(request, pk):
         student.monthly_fee = request.POST.get('monthly_fee')
         student.save()
         if request.headers.get('HX-Request'):
-            response = render(request, 'students.html', {'students': Student.objects.all().order_by('name')})
-            response['HX-Trigger'] = json.dumps({
-                "showToast": {
-                    "message": "Student updated",
-                    "type": "success"
-                }
-            })
-            return response
+            student.refresh_from_db(fields=['monthly_fee'])
+            return _student_row_response(request, student, "Student updated")
         return redirect('view_students')
     
+    if request.headers.get('HX-Request'):
+        return render(request, 'partials/student_edit_row.html', {'student': student})
     return render(request, 'student_form.html', {'title': 'Update Student', 'student': student, 'is_update': True})
 
+@login_required(login_url='login')
+def student_row(request, pk):
+    """One row of the students table; the Cancel button of the inline editor."""
+    student = Student.objects.get(pk=pk)
+    return render(request, 'partials/student_row.html', {'student': _with_last_paid_month(student)})
+
 @login_required(login_url='login')
 def delete_student(request, pk):
     if request.user.is_staff:
-        Student.objects.get(pk=pk).delete()
+        with transaction.atomic():
+            student = Student.objects.get(pk=pk)
+            finance_summary.record_student_removal(student)
+            student.delete()
     
     if request.headers.get('HX-Request'):
-        response = HttpResponse("")
+        response = render(request, 'partials/student_count.html', {
+            'student_count': Student.objects.count(),
+            'oob': True,
+        })
         response['HX-Trigger'] = json.dumps({
             "showToast": {
                 "message": "Student deleted",
@@ -657,62 +772,7 @@ def search_student_details(request):
     ).strip()
 
     if search_type == 'month':
-        try:
-            month_names = {
-                'january': 1,
-                'february': 2,
-                'march': 3,
-                'april': 4,
-                'may': 5,
-                'june': 6,
-                'july': 7,
-                'august': 8,
-                'september': 9,
-                'october': 10,
-                'november': 11,
-                'december': 12,
-            }
-
-            parts = search_query.lower().split()
-            if len(parts) >= 2:
-                month_name = parts[0]
-                year = int(parts[1])
-
-                if month_name in month_names:
-                    month = month_names[month_name]
-                    
-                    # Check if it's a holiday
-                    if HolidayMonth.objects.filter(year=year, month=month).exists():
-                        return render(request, 'partials/month_search_results.html', {
-                            'unpaid_students': [], # No unpaid students on holidays
-                            'month_name': month_name.capitalize(),
-                            'year': year,
-                            'month': month,
-                            'is_holiday': True
-                        })
-                    
-                    paid_statuses = ['Paid', 'Half Paid', 'Accepted']
-
-                    unpaid_students = Student.objects.exclude(
-                        year=year,
-                        month=month,
-                        payment_status__in=paid_statuses,
-                    ).order_by('name')
-
-                    return render(request, 'partials/month_search_results.html', {
-                        'unpaid_students': unpaid_students,
-                        'month_name': month_name.capitalize(),
-                        'year': year,
-                        'month': month,
-                        'is_holiday': False
-                    })
-        except Exception:
-            pass
-
-        return render(request, 'partials/month_search_results.html', {
-            'error': True,
-            'search_query': search_query,
-        })
+        return _render_month_search(request, search_query)
 
     student = None
     last_paid_month = None
@@ -750,6 +810,7 @@ def search_student_details(request):
     })
 
 @login_required(login_url='login')
+@conditional_on('Student', 'StudentMonthlyStatus', 'HolidayMonth', 'StudentDiscount')
 def student_annual_report(request):
     student_id = request.GET.get('student_id')
     year = request.GET.get('year', datetime.now().year)
@@ -768,17 +829,20 @@ def student_annual_report(request):
 
     months = []
     
-    holidays = {h.month: h for h in HolidayMonth.objects.filter(year=year)}
+    calendar = get_calendar()
+    holidays = {m: h for (y, m), h in calendar.holidays.items() if y == year}
     
     if student:
+        # One indexed lookup for every month the student paid towards this year
+        statuses = {row.month: row for row in student.monthly_statuses.filter(year=year)}
         for month in range(1, 13):
             # Check if this month/year matches the student's payment data
-            if student.year == year and student.month == month:
+            if month in statuses:
                 months.append({
                     'month': month,
                     'month_name': datetime(year, month, 1).strftime('%B'),
-                    'status': student.payment_status,
-                    'paid_amount': student.paid_amount,
+                    'status': statuses[month].status,
+                    'paid_amount': statuses[month].paid_amount,
                 })
             elif month in holidays:
                 h = holidays[month]
@@ -912,6 +976,24 @@ def delete_student_discount(request, discount_id):
     
     return redirect('manage_holidays')
 
+def _has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def metrics_view(request):
+    """Text exposition of request, query and domain metrics for staff or scrapers holding METRICS_TOKEN."""
+    if not request.user.is_staff and not _has_metrics_token(request):
+        return HttpResponseForbidden()
+    counters, histograms = metrics.collect()
+    gauges = {
+        'pending_payments': DraftPayment.objects.filter(status__in=PENDING_PAYMENT_STATUSES).count(),
+        'pending_expenses': DraftExpense.objects.filter(status='Draft').count(),
+    }
+    return HttpResponse(
+        metrics.render(counters, histograms, gauges), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 @login_required(login_url='login')
 def student_autocomplete(request):
     """Return student names that start with the given query"""
@@ -920,11 +1002,12 @@ def student_autocomplete(request):
     if not query:
         return JsonResponse({'suggestions': []})
     
-    # Get students whose names start with the query (case-insensitive)
-    students = Student.objects.filter(
-        name__istartswith=query
-    ).order_by('name')[:10]  # Limit to 10 suggestions
+    # Get students whose names start with the query (case-insensitive), limit to 10 suggestions
+    if settings.STUDENT_AUTOCOMPLETE_BACKEND == 'database':
+        names = student_index.database_prefix(query, limit=10)
+    else:
+        names = student_index.get_index().prefix(query, limit=10)
     
-    suggestions = [{'name': student.name} for student in students]
+    suggestions = [{'name': name} for name in names]
     
     return JsonResponse({'suggestions': suggestions})